@@ -1,5 +1,8 @@
+import logging
 from bs4 import BeautifulSoup
 
+logger = logging.getLogger(__name__)
+
 def convert_html_to_txt(html_file="transcript.html", txt_file="transcript.txt"):
     with open(html_file, "r", encoding="utf-8") as f:
         html_content = f.read()
@@ -10,4 +13,4 @@ def convert_html_to_txt(html_file="transcript.html", txt_file="transcript.txt"):
     with open(txt_file, "w", encoding="utf-8") as f:
         f.write(text)
 
-    print(f"Transcript converted to {txt_file}")
\ No newline at end of file
+    logger.info("Transcript converted to %s", txt_file)
\ No newline at end of file
@@ -0,0 +1,84 @@
+# answer_cache.py
+import itertools
+import time
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+
+
+class AnswerCache:
+    """
+    Semantic cache of chat answers. A question about a video is answered from the cache when its embedding
+    has cosine similarity >= threshold with a previously answered question about the same video.
+    Entries expire after ttl_seconds; beyond max_entries the least recently used are dropped.
+    """
+
+    def __init__(self, threshold=0.92, ttl_seconds=3600, max_entries=512):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # entry id -> (video_id, unit-length embedding, answer, created)
+        self._entries = OrderedDict()
+        self._by_video = {}
+        self._ids = itertools.count()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, video_id, embedding):
+        """Returns the cached answer to the most similar earlier question, or None."""
+        query = self._unit(embedding)
+        now = time.time()
+        with self._lock:
+            ids = [i for i in self._by_video.get(video_id, ()) if i in self._entries]
+            live = []
+            for entry_id in ids:
+                if now - self._entries[entry_id][3] > self.ttl_seconds:
+                    self._remove(entry_id)
+                else:
+                    live.append(entry_id)
+            if not live:
+                self.misses += 1
+                return None
+
+            similarities = np.stack([self._entries[i][1] for i in live]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            entry_id = live[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id][2]
+
+    def store(self, video_id, embedding, answer):
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (video_id, self._unit(embedding), answer, time.time())
+            self._by_video.setdefault(video_id, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id):
+        video_id = self._entries.pop(entry_id)[0]
+        ids = self._by_video.get(video_id)
+        if ids is not None:
+            ids.remove(entry_id)
+            if not ids:
+                del self._by_video[video_id]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
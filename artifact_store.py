@@ -0,0 +1,90 @@
+# artifact_store.py
+import gzip
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from file_utils import atomic_write
+
+# Artifact name -> mimetype of everything the pipeline produces per video
+ARTIFACTS = {
+    "summary.html": "text/html",
+    "transcript.html": "text/html",
+    "transcript.txt": "text/plain",
+    "transcript.srt": "application/x-subrip",
+    "transcript.vtt": "text/vtt",
+    "transcript.json": "application/json",
+    "chapters.json": "application/json",
+}
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class ArtifactStore:
+    """
+    Per-video output files (summary page, transcript page, transcript exports, chapter JSON),
+    stored as <root_dir>/<video_id>/<name>. Every write goes to a temporary file that is renamed
+    into place, so readers only ever see complete artifacts. A gzip copy (<name>.gz) is written
+    next to each artifact of at least compress_min_bytes, so the web server never compresses per request.
+    """
+
+    def __init__(self, root_dir='./cache/artifacts', compress_min_bytes=1024):
+        self.root_dir = root_dir
+        self.compress_min_bytes = compress_min_bytes
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def path(self, video_id, name):
+        """Path of one artifact; raises ValueError for unknown names and ids that are not plain video ids."""
+        if name not in ARTIFACTS:
+            raise ValueError(f"Unknown artifact: {name}")
+        if not VIDEO_ID_PATTERN.match(video_id or ""):
+            raise ValueError(f"Invalid video id: {video_id!r}")
+        return os.path.join(self.root_dir, video_id, name)
+
+    def exists(self, video_id, name):
+        return os.path.exists(self.path(video_id, name))
+
+    def names(self, video_id):
+        """Names of the artifacts present for video_id."""
+        return [name for name in ARTIFACTS if self.exists(video_id, name)]
+
+    def read(self, video_id, name):
+        with open(self.path(video_id, name), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def write(self, video_id, name, content):
+        with self.writer(video_id, name) as f:
+            f.write(content)
+
+    @contextmanager
+    def writer(self, video_id, name):
+        """
+        Opens a text file to write the artifact into, possibly piece by piece.
+        The artifact (and its gzip copy) only replaces the previous version once the block exits cleanly.
+        """
+        path = self.path(video_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        gz_path = path + ".gz"
+        with atomic_write(path) as f:
+            yield f
+            # Drop the old gzip copy before the new artifact goes live, so the two never disagree
+            _remove(gz_path)
+        if os.path.getsize(path) >= self.compress_min_bytes:
+            with open(path, "rb") as src, atomic_write(gz_path, "wb") as raw, gzip.open(raw, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_artifact_store = None
+
+
+def get_artifact_store():
+    global _artifact_store
+    if _artifact_store is None:
+        _artifact_store = ArtifactStore()
+    return _artifact_store
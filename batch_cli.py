@@ -0,0 +1,160 @@
+# batch_cli.py
+"""
+Headless batch processing: runs the summary pipeline (transcript fetch, chapter titling, artifacts,
+chat/search index) for every video in a file of YouTube URLs or video ids, without the GUI or Flask.
+
+Videos are processed in parallel on a thread pool that shares one Gemini rate limit. Each finished
+video is recorded in a checkpoint file, so an interrupted run picks up where it stopped. Videos that
+failed, or were only partly processed (untitled chapters, no chat/search index), are retried with
+--retry-failed.
+Only the embedding model is loaded (for the chat/search index), never the LLM.
+
+Usage: python batch_cli.py videos.txt [--workers 4] [--checkpoint ./cache/batch_checkpoint.json]
+                                      [--retry-failed] [--force] [--no-index]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+from file_utils import atomic_write
+from gemini_intergration import RateLimiter, REQUESTS_PER_MINUTE
+from pipeline import process_video, extract_video_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = "./cache/batch_checkpoint.json"
+
+
+def read_video_ids(path):
+    """Video ids from a file with one URL or id per line, in order and without duplicates. Skips # comments."""
+    video_ids = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            video_id = extract_video_id(line)
+            if video_id is None:
+                logger.warning("Line %d: no YouTube video id in %r, skipping.", line_number, line)
+            elif video_id not in seen:
+                seen.add(video_id)
+                video_ids.append(video_id)
+    return video_ids
+
+
+class Checkpoint:
+    """Outcome of every processed video, kept in a JSON file that is rewritten atomically after each one."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable checkpoint %s: %s", path, e)
+
+    def status(self, video_id):
+        with self._lock:
+            return self.entries.get(video_id, {}).get("status")
+
+    def record(self, video_id, **entry):
+        with self._lock:
+            self.entries[video_id] = dict(entry, finished=time.time())
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with atomic_write(self.path) as f:
+                json.dump(self.entries, f, indent=1)
+
+
+def run_batch(video_ids, checkpoint, workers=4, chat_handler=None, force=False, retry_failed=False,
+              requests_per_minute=REQUESTS_PER_MINUTE):
+    """
+    Processes video_ids in parallel, skipping those the checkpoint has as done (or failed or partial,
+    unless retry_failed).
+    :return: Dict with the number of processed, partial, failed and skipped videos.
+    """
+    def pending(video_id):
+        status = checkpoint.status(video_id)
+        return force or status is None or (status in ("failed", "partial") and retry_failed)
+
+    todo = [video_id for video_id in video_ids if pending(video_id)]
+    counts = {"processed": 0, "partial": 0, "failed": 0, "skipped": len(video_ids) - len(todo)}
+    if counts["skipped"]:
+        logger.info("Skipping %d videos already in the checkpoint.", counts["skipped"])
+    if not todo:
+        return counts
+
+    # One limit for all workers, so parallel videos do not multiply the Gemini request rate
+    rate_limiter = RateLimiter(requests_per_minute)
+
+    def process(video_id):
+        started = time.perf_counter()
+        result = process_video(video_id, chat_handler=chat_handler, force=force, rate_limiter=rate_limiter)
+        return result, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        futures = {executor.submit(process, video_id): video_id for video_id in todo}
+        for finished, future in enumerate(as_completed(futures), 1):
+            video_id = futures[future]
+            try:
+                result, seconds = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                checkpoint.record(video_id, status="failed", error=str(e))
+                logger.error("[%d/%d] %s failed: %s", finished, len(todo), video_id, e)
+            else:
+                if result["problems"]:
+                    counts["partial"] += 1
+                    error = "; ".join(result["problems"])
+                    checkpoint.record(video_id, status="partial", error=error, summary=result["summary"],
+                                      seconds=round(seconds, 2))
+                    logger.warning("[%d/%d] %s partly processed in %.1fs: %s", finished, len(todo), video_id,
+                                   seconds, error)
+                else:
+                    counts["processed"] += 1
+                    checkpoint.record(video_id, status="done", summary=result["summary"], seconds=round(seconds, 2))
+                    logger.info("[%d/%d] %s done in %.1fs.", finished, len(todo), video_id, seconds)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="File with one YouTube URL or video id per line")
+    parser.add_argument("--workers", type=int, default=4, help="Videos processed in parallel")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--retry-failed", action="store_true", help="Retry videos that failed or were partly processed in an earlier run")
+    parser.add_argument("--force", action="store_true", help="Reprocess every video and regenerate its artifacts")
+    parser.add_argument("--no-index", action="store_true", help="Skip the chat/search index (no embedding model)")
+    parser.add_argument("--requests-per-minute", type=int, default=REQUESTS_PER_MINUTE,
+                        help="Gemini request limit shared by all workers")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "INFO"))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    video_ids = read_video_ids(args.input)
+    logger.info("Read %d videos from %s.", len(video_ids), args.input)
+
+    chat_handler = None
+    if not args.no_index:
+        from chatbox import ChatHandler
+        chat_handler = ChatHandler()
+        chat_handler.start_loading(load_llm=False)
+
+    started = time.perf_counter()
+    counts = run_batch(video_ids, Checkpoint(args.checkpoint), args.workers, chat_handler, args.force,
+                       args.retry_failed, args.requests_per_minute)
+    logger.info("Finished in %.1fs: %d processed, %d partial, %d failed, %d skipped.",
+                time.perf_counter() - started, counts["processed"], counts["partial"], counts["failed"],
+                counts["skipped"])
+    return 1 if counts["failed"] or counts["partial"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
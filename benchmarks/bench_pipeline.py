@@ -0,0 +1,199 @@
+# benchmarks/bench_pipeline.py
+"""
+End-to-end offline benchmark of the summary and chat pipeline.
+
+Drives the real code paths against the local stand-ins in benchmarks/fakes.py (no YouTube, no Gemini
+API key, no model files):
+  chunk_transcript        gemini_intergration.chunk_transcript on a synthetic transcript
+  summary_html            gemini_intergration.generate_summary_html with a latency-injecting fake client
+  build_vector_db         ChatHandler._build_vector_db with a tiny hashing embedder
+  retrieve                ChatHandler.retrieve (hybrid dense + BM25)
+  ask_question            ChatHandler.ask_question with a stub Llama (answer cache disabled)
+  flask_chat              POST /chat through the Flask test client, from --concurrency threads
+
+For each stage it records latency percentiles, throughput and the tracemalloc peak, and writes them
+to a JSON file. Pass --compare with an earlier result file to print the change per stage.
+All caches are written to a temporary directory, so runs never touch ./cache.
+
+Usage: python benchmarks/bench_pipeline.py [--minutes 60] [--iterations 20] [--output results.json]
+                                           [--compare baseline.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from fakes import synthetic_transcript, FakeGenaiClient, StubLlama, TinyEmbedder
+
+QUESTIONS = [
+    "what does the speaker say about gradient memory",
+    "how is the cache index used for search",
+    "which example shows the thread batch stream",
+    "when is the video player timestamp explained",
+    "what result did the paper method get",
+]
+
+
+def summarize(latencies, wall_seconds, items=None):
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p90_ms": float(np.percentile(latencies_ms, 90)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "max_ms": float(latencies_ms.max()),
+        "ops_per_sec": len(latencies) / wall_seconds if wall_seconds > 0 else None,
+        "items_per_sec": (items / wall_seconds) if items and wall_seconds > 0 else None,
+    }
+
+
+def run_stage(name, func, iterations, items_per_call=None, concurrency=1):
+    """Calls func(i) iterations times (on concurrency threads) and returns its latency/throughput/memory summary."""
+    def timed(i):
+        started = time.perf_counter()
+        func(i)
+        return time.perf_counter() - started
+
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed, range(iterations)))
+    else:
+        latencies = [timed(i) for i in range(iterations)]
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+
+    result = summarize(latencies, wall, items_per_call * iterations if items_per_call else None)
+    result["peak_memory_mb"] = (peak - baseline) / 1e6
+    print(f"{name:<16} p50 {result['p50_ms']:9.2f} ms   p90 {result['p90_ms']:9.2f} ms   "
+          f"p99 {result['p99_ms']:9.2f} ms   {result['ops_per_sec']:9.1f} ops/s   "
+          f"peak {result['peak_memory_mb']:7.1f} MB")
+    return result
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["stages"]
+    print(f"\nChange against {baseline_path} (p50 latency, peak memory):")
+    for name, stage in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        latency_change = (stage["p50_ms"] / old["p50_ms"] - 1) * 100 if old["p50_ms"] else 0.0
+        print(f"{name:<16} {old['p50_ms']:9.2f} -> {stage['p50_ms']:9.2f} ms ({latency_change:+6.1f}%)   "
+              f"{old['peak_memory_mb']:7.1f} -> {stage['peak_memory_mb']:7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60, help="Length of the synthetic video")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--summary-iterations", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4, help="Threads posting to /chat")
+    parser.add_argument("--gemini-latency", type=float, default=0.2, help="Seconds per fake Gemini request")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="Seconds per stub LLM token")
+    parser.add_argument("--output", default="bench_pipeline_results.json")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own log output")
+    args = parser.parse_args()
+    output_path = os.path.abspath(args.output)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    # The pipeline logs every step at INFO; by default only warnings and errors get through
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # The project modules create their default caches relative to the working directory on import
+        os.chdir(workdir)
+        from answer_cache import AnswerCache
+        from chatbox import ChatHandler
+        from corpus_index import CorpusIndex
+        from embedding_cache import EmbeddingCache
+        from gemini_intergration import chunk_transcript, generate_summary_html
+        import main as app_module
+
+        transcript = synthetic_transcript(args.minutes)
+        chunks = chunk_transcript(transcript)
+        print(f"Synthetic transcript: {len(transcript)} snippets, {len(chunks)} title chapters "
+              f"({args.minutes:g} min of video)\n")
+
+        handler = ChatHandler(
+            embedder=TinyEmbedder(),
+            llm=StubLlama(seconds_per_token=args.token_latency),
+            embedding_cache=EmbeddingCache(os.path.join(workdir, "embeddings")),
+            corpus_index=CorpusIndex(os.path.join(workdir, "corpus")),
+            # A threshold above 1 never matches, so every question reaches the LLM
+            answer_cache=AnswerCache(threshold=2.0),
+            max_queued_questions=max(8, args.concurrency),
+        )
+        app_module.global_chat_handler = handler
+        client = app_module.app.test_client()
+        fetch = lambda video_id: transcript
+
+        tracemalloc.start()
+        stages = {}
+        stages["chunk_transcript"] = run_stage(
+            "chunk_transcript", lambda i: chunk_transcript(transcript), args.iterations,
+            items_per_call=len(transcript))
+        stages["summary_html"] = run_stage(
+            "summary_html",
+            lambda i: generate_summary_html(transcript, "benchvideo1", client=FakeGenaiClient(args.gemini_latency),
+                                            use_title_cache=False),
+            args.summary_iterations, items_per_call=len(chunks))
+
+        vector_db = handler._build_vector_db(transcript)
+        stages["build_vector_db"] = run_stage(
+            "build_vector_db", lambda i: handler._build_vector_db(transcript), max(1, args.iterations // 4),
+            items_per_call=len(vector_db))
+        stages["retrieve"] = run_stage(
+            "retrieve", lambda i: handler.retrieve(QUESTIONS[i % len(QUESTIONS)], vector_db), args.iterations * 10)
+
+        # Index once up front, so the chat stages measure warm-context questions
+        handler.index_video("benchvideo1", transcript)
+        stages["ask_question"] = run_stage(
+            "ask_question",
+            lambda i: handler.ask_question(f"{QUESTIONS[i % len(QUESTIONS)]} ({i})", "benchvideo1", fetch),
+            args.iterations)
+
+        def post_chat(i):
+            response = client.post("/chat", json={"question": f"{QUESTIONS[i % len(QUESTIONS)]} [{i}]",
+                                                  "video_id": "benchvideo1"})
+            if response.status_code != 200:
+                raise RuntimeError(f"/chat returned {response.status_code}: {response.get_data(as_text=True)}")
+
+        stages["flask_chat"] = run_stage(
+            "flask_chat", post_chat, args.iterations, concurrency=args.concurrency)
+        tracemalloc.stop()
+        os.chdir(original_dir)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": vars(args),
+        "transcript": {"snippets": len(transcript), "title_chapters": len(chunks), "chat_chunks": len(vector_db)},
+        "stages": stages,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {output_path}")
+    if compare_path:
+        compare(stages, compare_path)
+
+
+if __name__ == "__main__":
+    main()
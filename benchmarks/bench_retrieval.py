@@ -0,0 +1,114 @@
+# benchmarks/bench_retrieval.py
+"""
+Compares retrieval latency and recall of:
+  - cosine_loop: the original ChatHandler.retrieve (one cosine_similarity call per chunk, then a full sort)
+  - dense:       VectorStore.search (one matmul + argpartition)
+  - hybrid:      VectorStore.hybrid_search (dense + BM25, reciprocal rank fusion)
+
+Runs offline on a synthetic corpus: every chunk talks about one of a few topics and mentions one rare
+name. Embeddings (a stand-in for all-MiniLM-L6-v2) capture the topic well but the name only weakly,
+which is exactly where pure dense retrieval struggles. Each query asks about one chunk's name and topic;
+recall@k is the share of queries whose chunk is in the top k.
+
+Usage: python benchmarks/bench_retrieval.py [--chunks 5000] [--queries 200] [--top-n 3]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vector_store import VectorStore
+
+
+def cosine_similarity(a, b):
+    # Verbatim copy of the pre-VectorStore ChatHandler.cosine_similarity, as the baseline
+    a_np = np.array(a)
+    b_np = np.array(b)
+    dot = np.dot(a_np, b_np)
+    norm_a = np.linalg.norm(a_np)
+    norm_b = np.linalg.norm(b_np)
+    if norm_a == 0 or norm_b == 0:
+        return 0.0
+    return float(dot / (norm_a * norm_b))
+
+
+def cosine_loop(vector_db, query_embedding, top_n):
+    scored_chunks = []
+    for chunk_text, emb in vector_db:
+        sim = cosine_similarity(query_embedding, emb)
+        scored_chunks.append((chunk_text, sim))
+    scored_chunks.sort(key=lambda x: x[1], reverse=True)
+    return scored_chunks[:top_n]
+
+
+def build_corpus(n_chunks, n_topics, dim, rng):
+    vocab = [f"word{i}" for i in range(2000)]
+    topic_words = [rng.choice(vocab, 15, replace=False) for _ in range(n_topics)]
+    topic_vectors = rng.normal(size=(n_topics, dim))
+    texts, embeddings, targets = [], [], []
+    for i in range(n_chunks):
+        topic = int(rng.integers(n_topics))
+        name = f"name{i}"
+        words = list(rng.choice(topic_words[topic], 10)) + list(rng.choice(vocab, 10)) + [name]
+        rng.shuffle(words)
+        texts.append(" ".join(words))
+        # Strong topic signal, weak name signal, plus noise
+        name_vector = np.random.default_rng(i).normal(size=dim)
+        embeddings.append(topic_vectors[topic] + 0.15 * name_vector + 0.4 * rng.normal(size=dim))
+        targets.append((topic, name, name_vector))
+    return texts, np.asarray(embeddings, dtype=np.float32), topic_words, topic_vectors, targets
+
+
+def make_queries(n_queries, n_chunks, topic_words, topic_vectors, targets, dim, rng):
+    queries = []
+    for chunk_id in rng.choice(n_chunks, n_queries, replace=False):
+        topic, name, name_vector = targets[chunk_id]
+        text = f"what did they say about {name} and {' '.join(rng.choice(topic_words[topic], 2))}"
+        embedding = topic_vectors[topic] + 0.15 * name_vector + 0.4 * rng.normal(size=dim)
+        queries.append((int(chunk_id), text, embedding.astype(np.float32)))
+    return queries
+
+
+def run(name, retrieve, queries, texts, top_n):
+    latencies = []
+    hits = 0
+    for chunk_id, text, embedding in queries:
+        started = time.perf_counter()
+        results = retrieve(text, embedding)
+        latencies.append(time.perf_counter() - started)
+        hits += texts[chunk_id] in [r[0] for r in results[:top_n]]
+    latencies = np.asarray(latencies) * 1000
+    print(f"{name:<12} mean {latencies.mean():8.3f} ms   p50 {np.percentile(latencies, 50):8.3f} ms   "
+          f"p95 {np.percentile(latencies, 95):8.3f} ms   recall@{top_n} {hits / len(queries):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=40)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    texts, embeddings, topic_words, topic_vectors, targets = build_corpus(args.chunks, args.topics, args.dim, rng)
+    queries = make_queries(min(args.queries, args.chunks), args.chunks, topic_words, topic_vectors, targets,
+                           args.dim, rng)
+
+    started = time.perf_counter()
+    store = VectorStore(embeddings, texts)
+    print(f"Built VectorStore + BM25 index over {len(texts)} chunks in {time.perf_counter() - started:.3f}s "
+          f"({store.nbytes / 1e6:.1f} MB)")
+    legacy_db = [(text, embedding.tolist()) for text, embedding in zip(texts, embeddings)]
+
+    run("cosine_loop", lambda text, emb: cosine_loop(legacy_db, emb.tolist(), args.top_n), queries, texts, args.top_n)
+    run("dense", lambda text, emb: store.search(emb, args.top_n), queries, texts, args.top_n)
+    run("hybrid", lambda text, emb: store.hybrid_search(text, emb, args.top_n), queries, texts, args.top_n)
+
+
+if __name__ == "__main__":
+    main()
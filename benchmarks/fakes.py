@@ -0,0 +1,122 @@
+# benchmarks/fakes.py
+"""
+Local stand-ins for the pipeline's external backends, so it can be benchmarked offline:
+  - synthetic_transcript: YouTube-like snippets of any length
+  - FakeGenaiClient:      the google-genai client surface used by gemini_intergration, with injected latency
+  - StubLlama:            the llama_cpp.Llama surface used by ChatHandler, with per-token latency
+  - TinyEmbedder:         the SentenceTransformer.encode surface, as hashed bag-of-words vectors
+"""
+import json
+import re
+import time
+import zlib
+from threading import Lock
+import numpy as np
+
+WORDS = (
+    "model data training loss network layer gradient token context memory cache latency query index vector "
+    "video transcript chapter summary answer question search speaker slide example result paper method "
+    "python numpy server request thread batch stream page browser player timestamp minute second"
+).split()
+
+
+def synthetic_transcript(minutes=30, snippet_seconds=4.0, words_per_snippet=10, seed=0):
+    """Snippets like youtube_transcript_api returns, covering minutes of video."""
+    rng = np.random.default_rng(seed)
+    transcript = []
+    start = 0.0
+    while start < minutes * 60:
+        words = rng.choice(WORDS, words_per_snippet)
+        transcript.append({"text": " ".join(words), "start": round(start, 2), "duration": snippet_seconds})
+        start += snippet_seconds
+    return transcript
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeModels:
+    def __init__(self, latency, per_segment_latency):
+        self.latency = latency
+        self.per_segment_latency = per_segment_latency
+        self.calls = 0
+        self._lock = Lock()
+
+    def generate_content(self, model, contents):
+        with self._lock:
+            self.calls += 1
+        segments = re.findall(r"\[Segment \d+\]\n(.*)", contents)
+        time.sleep(self.latency + self.per_segment_latency * max(len(segments), 1))
+        if segments:
+            return _Response(json.dumps([" ".join(text.split()[:5]).title() for text in segments]))
+        return _Response(" ".join(contents.split()[-5:]).title())
+
+
+class FakeGenaiClient:
+    """Answers title prompts (single or batched) after latency + per_segment_latency * segments seconds."""
+
+    def __init__(self, latency=0.2, per_segment_latency=0.01):
+        self.models = _FakeModels(latency, per_segment_latency)
+
+
+class StubLlama:
+    """Generates a fixed answer at seconds_per_token, streamed or not; prompt evaluation costs prompt_token_seconds."""
+
+    ANSWER = "The speaker explains this around [01:30] and gives an example at [02:10]."
+
+    def __init__(self, seconds_per_token=0.002, prompt_token_seconds=0.00005):
+        self.seconds_per_token = seconds_per_token
+        self.prompt_token_seconds = prompt_token_seconds
+
+    def n_ctx(self):
+        return 4096
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return list(range(len(text.split()) + (1 if add_bos else 0)))
+
+    def reset(self):
+        pass
+
+    def eval(self, tokens):
+        time.sleep(self.prompt_token_seconds * len(tokens))
+
+    def save_state(self):
+        return object()
+
+    def load_state(self, state):
+        pass
+
+    def create_completion(self, prompt, stream=False, **kwargs):
+        time.sleep(self.prompt_token_seconds * len(prompt.split()))
+        words = self.ANSWER.split()
+        if stream:
+            return self._stream(words)
+        time.sleep(self.seconds_per_token * len(words))
+        return {"choices": [{"text": " " + " ".join(words)}], "usage": {"completion_tokens": len(words)}}
+
+    def _stream(self, words):
+        for word in words:
+            time.sleep(self.seconds_per_token)
+            yield {"choices": [{"text": " " + word}]}
+
+
+class TinyEmbedder:
+    """Hashes each word into one of dim buckets; similar texts share words and so get similar vectors."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, convert_to_numpy=True,
+               show_progress_bar=False):
+        single = isinstance(texts, str)
+        matrix = np.zeros((1 if single else len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate([texts] if single else texts):
+            for word in text.lower().split():
+                matrix[row, zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        return matrix[0] if single else matrix
@@ -0,0 +1,84 @@
+# bm25.py
+import math
+import re
+from collections import Counter
+import numpy as np
+
+# Unicode words, so names like "Gödel" or "Müller" stay whole; a straight or curly apostrophe joins a suffix
+TOKEN_PATTERN = re.compile(r"\w+(?:['\u2019]\w+)?")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.casefold())
+
+
+class BM25Index:
+    """
+    In-memory inverted index over a fixed list of texts with Okapi BM25 scoring.
+    Each term maps to parallel arrays of document ids and term frequencies, so scoring a query only
+    touches the postings of its own terms instead of every document.
+    """
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(texts)
+        doc_ids = {}
+        freqs = {}
+        lengths = np.zeros(self.n_docs, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(str(text)))
+            lengths[doc_id] = sum(counts.values())
+            for term, count in counts.items():
+                doc_ids.setdefault(term, []).append(doc_id)
+                freqs.setdefault(term, []).append(count)
+
+        self.doc_lens = lengths
+        self.avgdl = float(lengths.mean()) if self.n_docs else 0.0
+        self.postings = {
+            term: (np.asarray(ids, dtype=np.int32), np.asarray(freqs[term], dtype=np.float32))
+            for term, ids in doc_ids.items()
+        }
+        self.idf = {
+            term: math.log(1.0 + (self.n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, ids in doc_ids.items()
+        }
+
+    @property
+    def nbytes(self):
+        return self.doc_lens.nbytes + sum(ids.nbytes + tf.nbytes for ids, tf in self.postings.values())
+
+    def scores(self, query):
+        """BM25 score of every document for query (0.0 where no query term occurs)."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        if not self.avgdl:
+            return scores
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, tf = posting
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lens[docs] / self.avgdl)
+            scores[docs] += self.idf[term] * tf * (self.k1 + 1.0) / (tf + norm)
+        return scores
+
+    def search(self, query, top_n=10):
+        """Returns up to top_n (doc_id, score) pairs with a positive score, best first."""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_n:
+            matched = matched[np.argpartition(-scores[matched], top_n - 1)[:top_n]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(i), float(scores[i])) for i in matched]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuses several best-first lists of document ids into one, scoring each id by sum(1 / (k + rank)).
+    Only ranks matter, so scores on different scales (cosine, BM25) can be combined without tuning.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)
@@ -1,60 +1,449 @@
 # chatbox.py
-from sentence_transformers import SentenceTransformer
+import logging
 import numpy as np
-from llama_cpp import Llama
 import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Event, Lock, Thread
+from vector_store import VectorStore
+from embedding_cache import EmbeddingCache
+from context_pool import ContextPool
+from inference_scheduler import InferenceScheduler, SchedulerBusy, InferenceTimeout
+from prompt_cache import PromptPrefixCache
+from answer_cache import AnswerCache
+from chunking import window_chunks
+from corpus_index import CorpusIndex
+from context_packer import ContextPacker
+from text_utils import estimate_tokens
+import metrics
+
+logger = logging.getLogger(__name__)
+
+EMBEDDER_NAME = 'all-MiniLM-L6-v2'
+MODEL_PATH = './models/mistral-7b-instruct-v0.1.Q4_K_M.gguf'
+N_CTX = 4096
+# Chunks retrieved per question; the context packer decides how many of them fit the prompt
+RETRIEVAL_CANDIDATES = 20
+
+# Static start of every prompt. Keeping it first (and unchanged) lets its KV state be reused across questions
+SYSTEM_PROMPT = (
+    "You are a chatbot that answer questions about videos in which you have the transcript. Based on the provided context, answer the user's question completely.\n"
+    "Use only the following pieces of context to answer the question. "
+    "Each piece starts with its [mm:ss] timestamp in the video; cite the timestamps you used in that same form.\n"
+)
+
+# Chapter titles listed in a video's prompt header (evenly sampled beyond that), and headers kept in memory
+MAX_HEADER_CHAPTERS = 40
+MAX_VIDEO_HEADERS = 256
+
+# Sliding time windows embedded for retrieval (see chunking.window_chunks)
+DEFAULT_CHUNKING = {"window_seconds": 30, "overlap_seconds": 10, "max_words": 120}
+
+GENERATION_PARAMS = {
+    "max_tokens": 200,
+    "temperature": 0.5,
+    "top_p": 0.9,
+    "top_k": 40,
+    "stop": ["\nQuestion:", "\nAI:", "\nHuman:", "\nUser:", "\nAssistant:"],
+}
+
+
+class ModelNotReady(Exception):
+    """Raised when a question arrives before the embedder/LLM finished loading."""
 
 
 class ChatHandler:
-    def __init__(self):
-        print("ChatHandler: Initializing SentenceTransformer and Llama model (once)...")
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.llm = Llama(
-            model_path='./models/mistral-7b-instruct-v0.1.Q4_K_M.gguf',
-            n_ctx=4096,
-            n_batch=512,
-            n_threads=os.cpu_count(),
-            verbose=True
-        )
-        self.current_video_id = None
-        self.vector_db = []
-        print("ChatHandler: Initialization complete.")
-
-    def _build_vector_db(self, transcript_data):
-        """Builds the vector database from the given transcript data."""
-        print(f"ChatHandler: Building vector database with {len(transcript_data)} snippets.")
-        new_vector_db = []
-        for snippet in transcript_data:
-            chunk_text = snippet.get('text', '').strip()
-            if chunk_text:
-                embedding = self.embedder.encode(chunk_text).tolist()
-                new_vector_db.append((chunk_text, embedding))
-            # else:
-            # print(f"Warning: Skipping empty or invalid transcript snippet: {snippet}")
-        return new_vector_db
-
-    def cosine_similarity(self, a, b):
-        a_np = np.array(a)
-        b_np = np.array(b)
-        dot = np.dot(a_np, b_np)
-        norm_a = np.linalg.norm(a_np)
-        norm_b = np.linalg.norm(b_np)
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        return float(dot / (norm_a * norm_b))
-
-    def retrieve(self, query, top_n=3):
-        if not self.vector_db:
-            print("Warning: Attempted to retrieve from an empty vector_db (no transcript loaded).")
+    def __init__(self, embed_batch_size=64, embedding_cache=None, max_videos=8, max_context_bytes=256 * 1024 * 1024,
+                 max_queued_questions=8, llm_timeout=120.0, answer_cache=None, embedder=None, llm=None,
+                 chunking=None, hybrid_retrieval=True, corpus_index=None, context_packer=None):
+        """
+        Cheap to construct: the embedder and the LLM are loaded by start_loading() on a background thread
+        (or passed in ready-made via embedder/llm).
+        """
+        self.embedder = None
+        self.llm = None
+        self.scheduler = None
+        self.max_queued_questions = max_queued_questions
+        self.llm_timeout = llm_timeout
+        self.embedder_ready = Event()
+        self.llm_ready = Event()
+        self.load_error = None
+        self.load_seconds = {}
+        self._loader = None
+        self._loader_lock = Lock()
+        self._want_llm = False
+        if embedder is not None:
+            self._set_embedder(embedder)
+        if llm is not None:
+            self._set_llm(llm)
+
+        # Only touched from the scheduler's worker thread
+        self.prefix_cache = PromptPrefixCache()
+        # Optional per-video text (the chapter titles, see set_chapters) placed in the reusable prompt prefix
+        self.video_headers = OrderedDict()
+        self._video_headers_lock = Lock()
+        # Answers to (nearly) the same question about the same video are served without the LLM
+        self.answer_cache = answer_cache if answer_cache is not None else AnswerCache()
+        self.embed_batch_size = embed_batch_size
+        # Part of the embedding cache key: a change in how snippets are chunked invalidates cached vectors
+        self.chunking = dict(DEFAULT_CHUNKING, **(chunking or {}))
+        # Fuse BM25 keyword ranking with the embedding ranking in retrieve()
+        self.hybrid_retrieval = hybrid_retrieval
+        # Picks, dedupes and merges the retrieved chunks that fit the prompt token budget
+        self.context_packer = context_packer if context_packer is not None else ContextPacker()
+        self.embedding_cache = embedding_cache if embedding_cache is not None else EmbeddingCache()
+        # Warm per-video contexts, so users chatting about different videos don't evict each other
+        self.contexts = ContextPool(max_videos=max_videos, max_bytes=max_context_bytes)
+        # video_id -> Future of a context load in progress, so concurrent callers share one build
+        self._builds = {}
+        self._builds_lock = Lock()
+        # Every indexed video also goes into one cross-video search index
+        self.corpus_index = corpus_index if corpus_index is not None else CorpusIndex()
+
+    def _set_embedder(self, embedder):
+        self.embedder = embedder
+        self.embedder_ready.set()
+
+    def _set_llm(self, llm):
+        self.llm = llm
+        # The llama.cpp context is not thread-safe: every use of self.llm goes through this scheduler
+        self.scheduler = InferenceScheduler(llm, max_queue=self.max_queued_questions, timeout=self.llm_timeout)
+        self.llm_ready.set()
+
+    def start_loading(self, load_llm=True):
+        """Loads the embedder, then (if load_llm) the LLM, on a background thread. Safe to call repeatedly."""
+        with self._loader_lock:
+            self._want_llm = self._want_llm or load_llm
+            if self.load_error or (self._loader is not None and self._loader.is_alive()):
+                return
+            if self.embedder_ready.is_set() and (self.llm_ready.is_set() or not self._want_llm):
+                return
+            self._loader = Thread(target=self._load, name="model-loader", daemon=True)
+            self._loader.start()
+
+    def _load(self):
+        try:
+            if not self.embedder_ready.is_set():
+                logger.info("Loading SentenceTransformer in the background...")
+                started = time.perf_counter()
+                from sentence_transformers import SentenceTransformer
+                self._set_embedder(SentenceTransformer(EMBEDDER_NAME))
+                self.load_seconds["embedder"] = time.perf_counter() - started
+                logger.info("Embedder ready in %.1fs.", self.load_seconds["embedder"])
+
+            if self._want_llm and not self.llm_ready.is_set():
+                logger.info("Loading Llama model in the background...")
+                started = time.perf_counter()
+                from llama_cpp import Llama
+                self._set_llm(Llama(
+                    model_path=MODEL_PATH,
+                    n_ctx=N_CTX,
+                    n_batch=512,
+                    n_threads=os.cpu_count(),
+                    verbose=True
+                ))
+                self.load_seconds["llm"] = time.perf_counter() - started
+                logger.info("LLM ready in %.1fs.", self.load_seconds["llm"])
+        except Exception as e:
+            logger.exception("Failed to load models: %s", e)
+            self.load_error = str(e)
+
+    @property
+    def is_ready(self):
+        return self.embedder_ready.is_set() and self.llm_ready.is_set()
+
+    def status(self):
+        if self.load_error:
+            state = "error"
+        elif self.is_ready:
+            state = "ready"
+        elif self._loader is not None:
+            state = "warming_up"
+        else:
+            state = "cold"
+        return {
+            "state": state,
+            "embedder_ready": self.embedder_ready.is_set(),
+            "llm_ready": self.llm_ready.is_set(),
+            "load_seconds": dict(self.load_seconds),
+            "error": self.load_error,
+        }
+
+    def wait_for_embedder(self, timeout=None):
+        """Blocks until the embedder is loaded (starting the loader if needed); raises ModelNotReady on failure."""
+        self.start_loading(load_llm=False)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Wake up periodically, so a failed load is reported instead of waiting forever
+        while not self.embedder_ready.wait(0.5):
+            if self.load_error:
+                raise ModelNotReady(self.load_error)
+            if deadline is not None and time.monotonic() >= deadline:
+                raise ModelNotReady("Embedding model is still loading.")
+        return self.embedder
+
+    def _require_ready(self):
+        if not self.is_ready:
+            self.start_loading()
+            raise ModelNotReady(self.load_error or "AI models are still loading.")
+
+    def _embed_texts(self, texts, progress=None):
+        """
+        Encodes texts in batches of self.embed_batch_size, normalized on encode.
+        :param progress: Optional callable(done, total) invoked after every batch.
+        :return: float32 matrix with one unit-length row per text.
+        """
+        total = len(texts)
+        batches = []
+        started = time.perf_counter()
+        for offset in range(0, total, self.embed_batch_size):
+            batch = texts[offset:offset + self.embed_batch_size]
+            batches.append(self.embedder.encode(
+                batch,
+                batch_size=self.embed_batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            ))
+            done = offset + len(batch)
+            if progress:
+                progress(done, total)
+            else:
+                logger.debug("Embedded %d/%d chunks.", done, total)
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed > 0 else float('inf')
+        logger.info("Embedded %d chunks in %.2fs (%.1f chunks/sec).", total, elapsed, rate)
+        return np.vstack(batches).astype(np.float32, copy=False)
+
+    def _build_vector_db(self, transcript_data, progress=None):
+        """Builds the vector store (one embedding row per time window) from the given transcript data."""
+        with metrics.span("chunking"):
+            chunks = window_chunks(transcript_data, **self.chunking)
+        logger.info("Building vector database with %d chunks from %d snippets.", len(chunks), len(transcript_data))
+        if not chunks:
+            return None
+        texts = [chunk["text"] for chunk in chunks]
+        with metrics.span("embedding"):
+            embeddings = self._embed_texts(texts, progress)
+        return VectorStore(embeddings, texts, [chunk["start"] for chunk in chunks], [chunk["end"] for chunk in chunks],
+                           normalized=True)
+
+    def retrieve(self, query, vector_db, top_n=3, query_embedding=None):
+        """Returns the top_n most relevant chunks as (text, similarity, start, end, keyword_match) tuples, best first."""
+        if not vector_db:
+            logger.warning("Attempted to retrieve from an empty vector_db (no transcript loaded).")
             return []
 
-        query_embedding = self.embedder.encode(query).tolist()
-        scored_chunks = []
-        for chunk_text, emb in self.vector_db:
-            sim = self.cosine_similarity(query_embedding, emb)
-            scored_chunks.append((chunk_text, sim))
-        scored_chunks.sort(key=lambda x: x[1], reverse=True)
-        return scored_chunks[:top_n]
+        with metrics.span("retrieval"):
+            if query_embedding is None:
+                query_embedding = self.embedder.encode(query)
+            if self.hybrid_retrieval:
+                return vector_db.hybrid_search(query, query_embedding, top_n)
+            return vector_db.search(query_embedding, top_n)
+
+    def _load_context(self, video_id, transcript_fetcher_func):
+        """
+        Returns the vector store for video_id, trying the in-memory pool, then the on-disk cache,
+        then fetching and embedding the transcript. Concurrent calls for the same video wait for
+        the first one instead of building the context again.
+        :return: (vector_db, error_message); exactly one of them is None.
+        """
+        vector_db = self.contexts.get(video_id)
+        metrics.record_cache("context", vector_db is not None)
+        if vector_db is not None:
+            logger.debug("Reusing existing transcript context for %s.", video_id)
+            return vector_db, None
+
+        with self._builds_lock:
+            build = self._builds.get(video_id)
+            is_owner = build is None
+            if is_owner:
+                build = self._builds[video_id] = Future()
+        if not is_owner:
+            # E.g. a question arriving while the summary pipeline is still indexing this video
+            logger.info("Waiting for the in-progress context build of %s.", video_id)
+            return build.result()
+
+        try:
+            result = self._build_context(video_id, transcript_fetcher_func)
+        except Exception as e:
+            build.set_exception(e)
+            raise
+        else:
+            build.set_result(result)
+        finally:
+            with self._builds_lock:
+                del self._builds[video_id]
+        return result
+
+    def _build_context(self, video_id, transcript_fetcher_func):
+        # A build that finished between the pool lookup and taking ownership already put its result there.
+        # peek, since the lookup in _load_context already counted this request
+        vector_db = self.contexts.peek(video_id)
+        if vector_db is not None:
+            return vector_db, None
+
+        logger.info("No warm context for %s. Loading context.", video_id)
+        vector_db = self.embedding_cache.load(video_id, EMBEDDER_NAME, self.chunking)
+        metrics.record_cache("embedding", vector_db is not None)
+        if vector_db is None:
+            logger.info("No cached embeddings for %s. Fetching new transcript.", video_id)
+            transcript_data = transcript_fetcher_func(video_id)
+            if not transcript_data:
+                return None, "(Sorry, no transcript found for this video.)"
+
+            vector_db = self._build_vector_db(transcript_data)
+            if not vector_db:
+                return None, "(Transcript found but no valid text chunks for analysis.)"
+            self.embedding_cache.save(video_id, EMBEDDER_NAME, self.chunking, vector_db)
+            self.corpus_index.add_video(video_id, vector_db)
+        elif not self.corpus_index.has_video(video_id):
+            self.corpus_index.add_video(video_id, vector_db)
+        self.contexts.put(video_id, vector_db)
+        return vector_db, None
+
+    def index_video(self, video_id, transcript_data):
+        """
+        Builds (or loads) the chat context of a video from an already fetched transcript and adds it to
+        the cross-video index. Only needs the embedder, so it works while the LLM is still loading.
+        :return: Number of indexed chunks.
+        """
+        self.wait_for_embedder()
+        vector_db, error = self._load_context(video_id, lambda _: transcript_data)
+        if error:
+            raise RuntimeError(error)
+        return len(vector_db)
+
+    def index_video_async(self, video_id, transcript_data):
+        """Runs index_video on a background thread; returns a Future of its result."""
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.index_video(video_id, transcript_data))
+            except Exception as e:
+                future.set_exception(e)
+
+        Thread(target=run, name=f"index-{video_id}", daemon=True).start()
+        return future
+
+    def search_videos(self, query, top_n=10):
+        """Searches the chunks of all indexed videos; returns dicts with video_id, start, end, text and score."""
+        if not self.embedder_ready.is_set():
+            self.start_loading()
+            raise ModelNotReady(self.load_error or "Embedding model is still loading.")
+        return self.corpus_index.search(self.embedder.encode(query), top_n)
+
+    def set_video_header(self, video_id, header):
+        """Sets a short per-video summary that is put into the cached prompt prefix for that video."""
+        with self._video_headers_lock:
+            self.video_headers[video_id] = header
+            self.video_headers.move_to_end(video_id)
+            while len(self.video_headers) > MAX_VIDEO_HEADERS:
+                self.video_headers.popitem(last=False)
+
+    def set_chapters(self, video_id, chapters):
+        """
+        Sets the video header to its chapter list (see pipeline.process_video), so the LLM knows the
+        outline of the whole video and not only the retrieved passages.
+        :param chapters: Dicts with start and title, as in chapters.json.
+        """
+        step = max(1, -(-len(chapters) // MAX_HEADER_CHAPTERS))
+        self.set_video_header(video_id, "".join(
+            ContextPacker.format_passage(c["title"], c["start"]) for c in chapters[::step]))
+
+    def _prompt_prefix(self, video_id):
+        with self._video_headers_lock:
+            header = self.video_headers.get(video_id)
+        if header:
+            return f"{SYSTEM_PROMPT}Video overview (chapters):\n{header}\n"
+        return SYSTEM_PROMPT
+
+    def _complete(self, llm, prefix, prompt, stream=False):
+        """
+        Runs on the scheduler worker: restores the state after prefix (per video if it has a header), then
+        generates. Always streams from llama_cpp, so prefill (restoring the prefix and evaluating the rest
+        of the prompt, which ends with the first token) and generation are timed apart.
+        """
+        started = time.perf_counter()
+        self.prefix_cache.prepare(llm, prefix)
+        chunks = self._timed_generation(llm.create_completion(prompt=prompt, stream=True, **GENERATION_PARAMS),
+                                        started)
+        if stream:
+            return chunks
+        text = "".join(chunk["choices"][0]["text"] for chunk in chunks)
+        return {"choices": [{"text": text}]}
+
+    @staticmethod
+    def _timed_generation(chunks, started):
+        """
+        Passes streamed chunks through. Records the time from started to the first chunk as prefill, and
+        the time and tokens (one per chunk) after it as generation.
+        """
+        first = None
+        tokens = 0
+        try:
+            for chunk in chunks:
+                if first is None:
+                    first = time.perf_counter()
+                    metrics.STAGE_SECONDS.observe(first - started, stage="llm_prefill")
+                    # The first token comes out of prompt evaluation: counted, but not in the generation speed
+                    metrics.LLM_TOKENS.inc()
+                else:
+                    tokens += 1
+                yield chunk
+        finally:
+            if first is not None:
+                elapsed = time.perf_counter() - first
+                metrics.STAGE_SECONDS.observe(elapsed, stage="llm_generation")
+                metrics.record_generation(tokens, elapsed)
+
+    def _count_tokens(self, text):
+        """Prompt tokens of text by the LLM's own tokenizer (a vocabulary lookup, so safe off the worker thread)."""
+        if self.llm is None:
+            return estimate_tokens(text)
+        return len(self.llm.tokenize(text.encode("utf-8"), add_bos=False))
+
+    def _build_prompt(self, user_query, video_id, transcript_fetcher_func, query_embedding=None):
+        """
+        Loads the video context, retrieves the relevant chunks and builds the LLM prompt.
+        :return: (prefix, prompt, error_message). prompt starts with prefix; on error both are None.
+        """
+     #Get the context for this video
+        try:
+            vector_db, error = self._load_context(video_id, transcript_fetcher_func)
+            if error:
+                return None, None, error
+        except Exception as e:
+            logger.exception("Error fetching or processing transcript for %s: %s", video_id, e)
+            return None, None, "(Error fetching video transcript.)"
+
+    #Retrieve relevant context for the response
+        retrieved = self.retrieve(user_query, vector_db, top_n=RETRIEVAL_CANDIDATES, query_embedding=query_embedding)
+        if not retrieved:
+            return None, None, "(Could not find relevant information in the video transcript.)"
+
+        with metrics.span("prompt_build"):
+            prefix = self._prompt_prefix(video_id)
+            # Context gets what n_ctx leaves after the fixed prompt parts and the answer, capped by the packer budget
+            fixed_tokens = self._count_tokens(f"{prefix}Context:\n\nQuestion: {str(user_query)}\nAnswer:")
+            available = N_CTX - fixed_tokens - GENERATION_PARAMS["max_tokens"] - 8
+            passages = self.context_packer.pack(retrieved, self._count_tokens,
+                                                min(self.context_packer.token_budget, available))
+            if not passages:
+                return None, None, "(Could not find relevant information in the video transcript.)"
+            context = ''.join(ContextPacker.format_passage(text, start) for text, _, start, _, _ in passages)
+
+            # 3. Construct prompt for LLM
+            logger.debug("Context for LLM for query %r (%d passages from %d retrieved chunks):\n%s",
+                         user_query, len(passages), len(retrieved), context)
+            prompt = (
+                prefix +
+                f"Context:\n{context}\n"
+                f"Question: {str(user_query)}\n"
+                "Answer:"
+            )
+        return prefix, prompt, None
 
     def ask_question(self, user_query, video_id, transcript_fetcher_func):
         """
@@ -63,67 +452,92 @@ class ChatHandler:
         :param video_id: The ID of the current YouTube video.
         :param transcript_fetcher_func: A callable function (e.g., get_transcript from main.py)
                                         that takes video_id and returns transcript data.
+        :raises SchedulerBusy: if too many questions are already waiting for the LLM.
+        :raises InferenceTimeout: if the answer took longer than llm_timeout.
+        :raises ModelNotReady: if the models are still loading (loading is started if it was not yet).
         """
-     #Check to see if video_id changed
-        if video_id != self.current_video_id or not self.vector_db:
-            print(f"ChatHandler: Video ID changed or no context. Fetching new transcript for {video_id}.")
-            try:
-                transcript_data = transcript_fetcher_func(video_id)
-                if not transcript_data:
-                    return "(Sorry, no transcript found for this video.)"
-
-                self.vector_db = self._build_vector_db(transcript_data)
-                if not self.vector_db:
-                    return "(Transcript found but no valid text chunks for analysis.)"
-                self.current_video_id = video_id
-            except Exception as e:
-                print(f"ChatHandler: Error fetching or processing transcript for {video_id}: {e}")
-                return "(Error fetching video transcript.)"
-        else:
-            print(f"ChatHandler: Reusing existing transcript context for {video_id}.")
-
-    #Retrieve relevant context for the response
-        retrieved = self.retrieve(user_query)
-        context_parts = []
-        if not retrieved:
-            return "(Could not find relevant information in the video transcript.)"
-
-        for chunk_text, _ in retrieved:
-            context_parts.append(f'- {str(chunk_text)}\n')
-        context = ''.join(context_parts)
-
-        # 3. Construct prompt for LLM
-        print(
-            f"\n--- Context for LLM for query '{user_query}': ---\n{context}\n---------------------------------------------\n")
-        prompt = (
-            "You are a chatbot that answer questions about videos in which you have the transcript. Based on the provided context, answer the user's question completely.\n"
-            "Use only the following pieces of context to answer the question. "
-            f"Context:\n{context}\n"
-            f"Question: {str(user_query)}\n"
-            "Answer:"
-        )
+        self._require_ready()
+        query_embedding = self.embedder.encode(user_query)
+        cached_answer = self.answer_cache.lookup(video_id, query_embedding)
+        metrics.record_cache("answer", cached_answer is not None)
+        if cached_answer is not None:
+            logger.info("Answering %r from the answer cache.", user_query)
+            return cached_answer
 
+        prefix, prompt, error = self._build_prompt(user_query, video_id, transcript_fetcher_func, query_embedding)
+        if error:
+            return error
 
         try:
-            result = self.llm.create_completion(
-                prompt=prompt,
-                max_tokens=200,
-                temperature=0.5,
-                top_p=0.9,
-                top_k=40,
-                stop=["\nQuestion:", "\nAI:", "\nHuman:", "\nUser:", "\nAssistant:"]
+            result = self.scheduler.submit(
+                lambda llm: self._complete(llm, prefix, prompt),
+                key=prompt
             )
-            print("LLM output:", result)
+            logger.debug("LLM output: %s", result)
 
             if result and 'choices' in result and len(result['choices']) > 0 and 'text' in result['choices'][0]:
                 generated_text = result['choices'][0]['text'].strip()
                 if not generated_text:
-                    print("Warning: LLM generated an empty string even after completion.")
+                    logger.warning("LLM generated an empty string even after completion.")
                     return "(AI struggled to provide an answer based on the context.)"
+                self.answer_cache.store(video_id, query_embedding, generated_text)
                 return generated_text
             else:
-                print("Warning: LLM response structure unexpected or empty.")
+                logger.warning("LLM response structure unexpected or empty.")
                 return "(No response from AI, unexpected output format.)"
+        except (SchedulerBusy, InferenceTimeout):
+            raise
+        except Exception as e:
+            logger.exception("Error during LLM completion: %s", e)
+            return "(An internal error occurred while generating a response.)"
+
+    def ask_question_stream(self, user_query, video_id, transcript_fetcher_func):
+        """
+        Same as ask_question, but returns an iterator yielding the answer piece by piece as the LLM
+        generates it. Error messages are yielded as a single piece.
+        :raises SchedulerBusy: immediately (not on iteration) if too many questions are already waiting.
+        :raises ModelNotReady: if the models are still loading.
+        """
+        self._require_ready()
+        query_embedding = self.embedder.encode(user_query)
+        cached_answer = self.answer_cache.lookup(video_id, query_embedding)
+        metrics.record_cache("answer", cached_answer is not None)
+        if cached_answer is not None:
+            logger.info("Answering %r from the answer cache.", user_query)
+            return iter([cached_answer])
+
+        prefix, prompt, error = self._build_prompt(user_query, video_id, transcript_fetcher_func, query_embedding)
+        if error:
+            return iter([error])
+
+        chunks = self.scheduler.stream(
+            lambda llm: self._complete(llm, prefix, prompt, stream=True)
+        )
+        return self._stream_answer(chunks, lambda answer: self.answer_cache.store(video_id, query_embedding, answer))
+
+    def _stream_answer(self, chunks, on_complete=None):
+        """Yields the generated pieces; on_complete(answer) is called once a real answer was fully generated."""
+        try:
+            pieces = []
+            for chunk in chunks:
+                text = chunk['choices'][0].get('text', '')
+                if not pieces:
+                    # Leading whitespace is stripped from the full answer in ask_question; match that here
+                    text = text.lstrip()
+                if text:
+                    pieces.append(text)
+                    yield text
+            if not pieces:
+                logger.warning("LLM generated an empty string even after completion.")
+                yield "(AI struggled to provide an answer based on the context.)"
+            elif on_complete:
+                on_complete(''.join(pieces).strip())
+        except InferenceTimeout:
+            logger.warning("Timed out while streaming the LLM answer.")
+            yield "(The AI took too long to respond. Please try again.)"
         except Exception as e:
-            print(f"Error during LLM completion: {e}")
-            return "(An internal error occurred while generating a response.)"
\ No newline at end of file
+            logger.exception("Error during streaming LLM completion: %s", e)
+            yield "(An internal error occurred while generating a response.)"
+        finally:
+            # Stops generation on the worker if the client went away mid-answer
+            chunks.close()
@@ -0,0 +1,49 @@
+# chunking.py
+
+
+def window_chunks(transcript, window_seconds=30, overlap_seconds=10, max_words=120):
+    """
+    Groups transcript snippets into overlapping time windows, the chat-side counterpart of
+    gemini_intergration.chunk_transcript. Caption lines are often only a few words long; embedding windows
+    instead gives retrieval whole thoughts and far fewer vectors to search.
+    :param window_seconds: Maximum span of snippet start times in one window.
+    :param overlap_seconds: How far each window reaches back into the previous one.
+    :param max_words: Closes a window early once it holds this many words (None for no limit).
+    :return: List of {"start", "end", "text"} dicts; start/end are in seconds.
+    """
+    snippets = [s for s in transcript if s.get("text", "").strip()]
+    snippets.sort(key=lambda s: s["start"])
+    chunks = []
+    i = 0
+    while i < len(snippets):
+        limit = snippets[i]["start"] + window_seconds
+        parts = []
+        words = 0
+        j = i
+        while j < len(snippets) and snippets[j]["start"] < limit:
+            text = snippets[j]["text"].strip()
+            count = len(text.split())
+            if parts and max_words and words + count > max_words:
+                break
+            parts.append(text)
+            words += count
+            j += 1
+
+        last = snippets[j - 1]
+        chunks.append({
+            "start": snippets[i]["start"],
+            "end": last["start"] + last.get("duration", 0.0),
+            "text": " ".join(parts),
+        })
+        if j >= len(snippets):
+            break
+
+        # The next window starts overlap_seconds before the first snippet this one left out, but no more
+        # than half this window's span back (max_words can close it early), and at least one snippet further
+        overlap = min(overlap_seconds, (snippets[j]["start"] - snippets[i]["start"]) / 2)
+        next_start = snippets[j]["start"] - overlap
+        k = i + 1
+        while k < j and snippets[k]["start"] < next_start:
+            k += 1
+        i = k
+    return chunks
@@ -0,0 +1,73 @@
+# context_packer.py
+from text_utils import estimate_tokens, format_timestamp
+
+
+def _join_overlapping(first, second):
+    """Concatenates two texts, dropping the words at the start of second that repeat the end of first."""
+    a = first.split()
+    b = second.split()
+    for size in range(min(len(a), len(b)), 0, -1):
+        if a[-size:] == b[:size]:
+            return " ".join(a + b[size:])
+    return " ".join(a + b)
+
+
+class ContextPacker:
+    """
+    Chooses which retrieved chunks go into the LLM prompt. Walking the candidates best first, it drops
+    those below min_similarity (always keeping the best one, and any BM25 keyword match: hybrid retrieval
+    ranks those for their exact terms, whatever their cosine similarity), skips chunks already covered by a chosen one,
+    merges chunks that overlap or are within merge_gap_seconds of a chosen one into a single passage, and
+    stops adding once the passages would exceed token_budget tokens. Passages come out in video order.
+    """
+
+    def __init__(self, token_budget=1536, min_similarity=0.25, merge_gap_seconds=2.0):
+        self.token_budget = token_budget
+        self.min_similarity = min_similarity
+        self.merge_gap_seconds = merge_gap_seconds
+
+    @staticmethod
+    def format_passage(text, start):
+        return f"- [{format_timestamp(start)}] {text}\n"
+
+    def pack(self, candidates, count_tokens=estimate_tokens, token_budget=None):
+        """
+        :param candidates: (text, similarity, start, end, keyword_match) tuples, best first (see ChatHandler.retrieve).
+        :param count_tokens: Callable(text) -> number of tokens, ideally the model's own tokenizer.
+        :param token_budget: Overrides self.token_budget for this call (e.g. to what is left of n_ctx).
+        :return: Merged (text, similarity, start, end, keyword_match) passages, in order of start time.
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        token_counts = {}
+
+        def tokens(passage):
+            key = (passage[0], passage[2])
+            if key not in token_counts:
+                token_counts[key] = count_tokens(self.format_passage(passage[0], passage[2]))
+            return token_counts[key]
+
+        passages = []
+        used = 0
+        for rank, (text, score, start, end, keyword_match) in enumerate(candidates):
+            if rank > 0 and score < self.min_similarity and not keyword_match:
+                continue
+            text = str(text)
+            touching = [p for p in passages
+                        if start <= p[3] + self.merge_gap_seconds and end >= p[2] - self.merge_gap_seconds]
+            if any(p[2] <= start and end <= p[3] for p in touching):
+                continue
+
+            # Merge with every passage this chunk overlaps or borders, in time order
+            group = sorted(touching + [(text, score, start, end, keyword_match)], key=lambda p: p[2])
+            merged_text = group[0][0]
+            for passage in group[1:]:
+                merged_text = _join_overlapping(merged_text, passage[0])
+            merged = (merged_text, max(p[1] for p in group), group[0][2], max(p[3] for p in group),
+                      any(p[4] for p in group))
+
+            new_used = used - sum(tokens(p) for p in touching) + tokens(merged)
+            if new_used > budget:
+                continue
+            passages = [p for p in passages if p not in touching] + [merged]
+            used = new_used
+        return sorted(passages, key=lambda p: p[2])
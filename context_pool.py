@@ -0,0 +1,71 @@
+# context_pool.py
+import logging
+from collections import OrderedDict
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class ContextPool:
+    """
+    Thread-safe LRU pool of per-video vector stores, bounded both by number of videos and by bytes.
+    Lets several users chat about different videos without evicting each other's context on every request.
+    """
+
+    def __init__(self, max_videos=8, max_bytes=256 * 1024 * 1024):
+        self.max_videos = max_videos
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, video_id):
+        with self._lock:
+            store = self._entries.get(video_id)
+            if store is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(video_id)
+            self.hits += 1
+            return store
+
+    def peek(self, video_id):
+        """Like get(), but counts neither a hit nor a miss and leaves the LRU order alone."""
+        with self._lock:
+            return self._entries.get(video_id)
+
+    def put(self, video_id, store):
+        with self._lock:
+            old = self._entries.pop(video_id, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[video_id] = store
+            self.total_bytes += store.nbytes
+            # Never evict the entry just added, even if it alone exceeds max_bytes
+            while len(self._entries) > 1 and (
+                    len(self._entries) > self.max_videos or self.total_bytes > self.max_bytes):
+                evicted_id, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+                self.evictions += 1
+                logger.info("Evicted context for %s.", evicted_id)
+
+    def __contains__(self, video_id):
+        with self._lock:
+            return video_id in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "videos": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,325 @@
+# corpus_index.py
+import json
+import logging
+import os
+import time
+import uuid
+from threading import Lock
+import numpy as np
+from file_utils import atomic_write, file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class CorpusIndex:
+    """
+    Persistent approximate nearest-neighbour index over the chunks of every processed video.
+    Uses an inverted file (IVF): a k-means codebook splits the unit-length vectors into n_lists cells,
+    and a query is only compared with the rows in its nprobe nearest cells. Adding a video assigns its
+    rows to the existing cells; the codebook is retrained once the corpus has grown retrain_factor-fold.
+    Below min_train_rows the index simply scans every row.
+
+    On disk, the index is a base snapshot plus one small segment file per video added since. Adding a
+    video only writes its segment; the segments are folded into a new snapshot once they hold as many rows
+    as it does (and at least compact_min_rows), or after retraining, so the bytes written stay linear in
+    the corpus size. All file writes happen outside the lock that search() takes.
+    Several processes (e.g. the GUI and batch_cli) may share index_dir: segment names never collide,
+    and a lock file serializes their writes. A snapshot is built from what is on disk, so it keeps the
+    videos other processes added; those show up in this process's searches once it takes the snapshot.
+    """
+
+    def __init__(self, index_dir='./cache/corpus', nprobe=8, min_train_rows=2000, retrain_factor=4,
+                 compact_min_rows=5000):
+        self.index_dir = index_dir
+        self.nprobe = nprobe
+        self.min_train_rows = min_train_rows
+        self.retrain_factor = retrain_factor
+        self.compact_min_rows = compact_min_rows
+        self._lock = Lock()
+        # Serializes file writes within this process; the lock file does so across processes
+        self._persist_lock = Lock()
+        self._lock_path = os.path.join(self.index_dir, "write.lock")
+        self._segments = {}  # video_id -> name of the segment file this process wrote for it
+        self._segment_rows = 0
+        self._snapshot_rows = 0
+        self._version = 0  # Bumped on every in-memory change, to tell whether a snapshot is still current
+        self.vectors = None
+        self.video_ids = []
+        self.starts = []
+        self.ends = []
+        self.texts = []
+        self.centroids = None
+        self.assignments = None
+        self.trained_rows = 0
+        self._order = None
+        self._bounds = None
+        os.makedirs(os.path.join(self.index_dir, "segments"), exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self.video_ids)
+
+    def has_video(self, video_id):
+        with self._lock:
+            return video_id in set(self.video_ids)
+
+    def add_video(self, video_id, store):
+        """Adds (or replaces) all chunks of one video from its VectorStore, then persists the index."""
+        with self._lock:
+            keep = [i for i, v in enumerate(self.video_ids) if v != video_id]
+            if self.vectors is not None and len(keep) != len(self.video_ids):
+                self.vectors = self.vectors[keep]
+                self.assignments = self.assignments[keep] if self.assignments is not None else None
+                self.video_ids = [self.video_ids[i] for i in keep]
+                self.starts = [self.starts[i] for i in keep]
+                self.ends = [self.ends[i] for i in keep]
+                self.texts = [self.texts[i] for i in keep]
+
+            new_vectors = np.asarray(store.matrix, dtype=np.float32)
+            self.vectors = new_vectors.copy() if self.vectors is None else np.vstack([self.vectors, new_vectors])
+            self.video_ids.extend([video_id] * len(store))
+            self.starts.extend(float(s) for s in store.starts)
+            self.ends.extend(float(e) for e in store.ends)
+            self.texts.extend(str(t) for t in store.texts)
+
+            retrained = False
+            if self.centroids is None:
+                if len(self.video_ids) >= self.min_train_rows:
+                    self._train()
+                    retrained = True
+            elif len(self.video_ids) > self.retrain_factor * self.trained_rows:
+                self._train()
+                retrained = True
+            else:
+                self.assignments = np.concatenate([self.assignments, self._assign(new_vectors)])
+                self._rebuild_lists()
+
+            self._version += 1
+            self._segment_rows += len(store)
+            # Retraining reassigns every row, and the snapshot is where the assignments are kept
+            compact = retrained or self._segment_rows >= max(self._snapshot_rows, self.compact_min_rows)
+
+        with self._persist_lock, file_lock(self._lock_path):
+            segment = self._save_segment(video_id, new_vectors, store)
+            with self._lock:
+                replaced = self._segments.get(video_id)
+                self._segments[video_id] = segment
+            if replaced is not None:
+                self._remove_segment(replaced)
+            if compact:
+                self._compact()
+        logger.info("Indexed %d chunks of %s (%d chunks in corpus).", len(store), video_id, len(self))
+
+    def search(self, query_embedding, top_n=10, nprobe=None):
+        """Returns the top_n chunks across all videos as dicts with video_id, start, end, text and score."""
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        with self._lock:
+            if self.vectors is None or not len(self.video_ids):
+                return []
+            if self.centroids is None:
+                candidates = np.arange(len(self.video_ids))
+            else:
+                probe = min(nprobe or self.nprobe, len(self.centroids))
+                cells = np.argpartition(-(self.centroids @ query), probe - 1)[:probe]
+                candidates = np.concatenate([self._order[self._bounds[c]:self._bounds[c + 1]] for c in cells])
+            if not len(candidates):
+                return []
+            scores = self.vectors[candidates] @ query
+            top_n = min(top_n, len(candidates))
+            best = np.argpartition(-scores, top_n - 1)[:top_n]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [{
+                "video_id": self.video_ids[candidates[i]],
+                "start": self.starts[candidates[i]],
+                "end": self.ends[candidates[i]],
+                "text": self.texts[candidates[i]],
+                "score": float(scores[i]),
+            } for i in best]
+
+    def _train(self, iterations=10, sample_size=20000):
+        n_rows = len(self.video_ids)
+        n_lists = int(min(1024, max(1, np.sqrt(n_rows))))
+        rng = np.random.default_rng(0)
+        sample = self.vectors[rng.choice(n_rows, min(sample_size, n_rows), replace=False)]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        # Spherical k-means: vectors are unit length, so the nearest centroid is the one with the largest dot
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[labels == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        self.centroids = centroids
+        self.trained_rows = n_rows
+        self.assignments = self._assign(self.vectors)
+        self._rebuild_lists()
+        logger.info("Trained %d IVF cells on %d chunks.", n_lists, n_rows)
+
+    def _assign(self, vectors, centroids=None):
+        centroids = self.centroids if centroids is None else centroids
+        labels = []
+        # Blocks keep the temporary (rows x cells) score matrix small
+        for offset in range(0, len(vectors), 4096):
+            labels.append(np.argmax(vectors[offset:offset + 4096] @ centroids.T, axis=1))
+        return np.concatenate(labels).astype(np.int32) if labels else np.zeros(0, dtype=np.int32)
+
+    def _rebuild_lists(self):
+        # Row ids grouped by cell: cell c owns _order[_bounds[c]:_bounds[c + 1]]
+        self._order = np.argsort(self.assignments, kind="stable")
+        self._bounds = np.searchsorted(self.assignments[self._order], np.arange(len(self.centroids) + 1))
+
+    def _paths(self):
+        return (os.path.join(self.index_dir, "vectors.npy"),
+                os.path.join(self.index_dir, "ivf.npz"),
+                os.path.join(self.index_dir, "chunks.json"))
+
+    def _segment_paths(self, segment):
+        base = os.path.join(self.index_dir, "segments", segment)
+        return base + ".npy", base + ".json"
+
+    def _segment_names(self):
+        # Names start with the creation time, so sorting them gives the order the segments were written in
+        names = os.listdir(os.path.join(self.index_dir, "segments"))
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def _save_segment(self, video_id, vectors, store):
+        segment = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        vectors_path, meta_path = self._segment_paths(segment)
+        with atomic_write(vectors_path, "wb") as f:
+            np.save(f, vectors)
+        # The JSON file is written last: a segment without one is incomplete and ignored
+        with atomic_write(meta_path) as f:
+            json.dump({"video_id": video_id, "starts": [float(s) for s in store.starts],
+                       "ends": [float(e) for e in store.ends], "texts": [str(t) for t in store.texts]}, f)
+        return segment
+
+    def _remove_segment(self, segment):
+        for path in reversed(self._segment_paths(segment)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _read_disk(self):
+        """
+        The index as stored: the snapshot with every newer segment applied (a video's latest segment
+        replaces its older rows). Needs the lock file, or no other process writing.
+        :return: (view dict with vectors, video_ids, starts, ends, texts and, from the snapshot's IVF file,
+                  centroids, trained_rows and the assignments of the rows taken from the snapshot;
+                  names of the segments read)
+        """
+        view = {"vectors": None, "video_ids": [], "starts": [], "ends": [], "texts": [],
+                "centroids": None, "trained_rows": 0, "assignments": None}
+        vectors_path, ivf_path, meta_path = self._paths()
+        if os.path.exists(vectors_path) and os.path.exists(meta_path):
+            try:
+                vectors = np.load(vectors_path)
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if len(vectors) != len(meta["video_ids"]):
+                    raise ValueError("vector and chunk counts differ")
+                view.update(vectors=vectors, video_ids=meta["video_ids"], starts=meta["starts"], ends=meta["ends"],
+                            texts=meta["texts"])
+                if os.path.exists(ivf_path):
+                    ivf = np.load(ivf_path)
+                    view.update(centroids=ivf["centroids"], trained_rows=int(ivf["trained_rows"]),
+                                assignments=ivf["assignments"])
+                    if len(view["assignments"]) != len(vectors):
+                        view["assignments"] = self._assign(vectors, view["centroids"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable index in %s: %s", self.index_dir, e)
+                view.update(vectors=None, video_ids=[], starts=[], ends=[], texts=[], centroids=None,
+                            assignments=None)
+
+        latest = {}
+        names = []
+        for segment in self._segment_names():
+            try:
+                segment_vectors_path, segment_meta_path = self._segment_paths(segment)
+                with open(segment_meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                vectors = np.load(segment_vectors_path)
+                if len(vectors) != len(meta["starts"]):
+                    raise ValueError("vector and chunk counts differ")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable index segment %s in %s: %s", segment, self.index_dir, e)
+                continue
+            names.append(segment)
+            latest[meta["video_id"]] = (vectors, meta)
+        if not latest:
+            return view, names
+
+        # Segment rows replace the snapshot rows of the same video
+        keep = [i for i, v in enumerate(view["video_ids"]) if v not in latest]
+        parts = ([view["vectors"][keep]] if view["vectors"] is not None else [])
+        parts += [vectors for vectors, _ in latest.values()]
+        view["vectors"] = np.vstack(parts)
+        if view["assignments"] is not None:
+            view["assignments"] = view["assignments"][keep]
+        for key in ("video_ids", "starts", "ends", "texts"):
+            view[key] = [view[key][i] for i in keep]
+        for video_id, (vectors, meta) in latest.items():
+            view["video_ids"].extend([video_id] * len(vectors))
+            view["starts"].extend(meta["starts"])
+            view["ends"].extend(meta["ends"])
+            view["texts"].extend(meta["texts"])
+        return view, names
+
+    def _compact(self):
+        """Folds every segment on disk into a new snapshot. Called with the persist lock and the lock file held."""
+        view, names = self._read_disk()
+        if view["vectors"] is None:
+            return
+        with self._lock:
+            version = self._version
+            centroids = self.centroids
+            trained_rows = self.trained_rows
+        # This process's codebook wins; the assignments are recomputed for the rows from disk
+        assignments = self._assign(view["vectors"], centroids) if centroids is not None else None
+
+        vectors_path, ivf_path, meta_path = self._paths()
+        with atomic_write(vectors_path, "wb") as f:
+            np.save(f, view["vectors"])
+        if centroids is not None:
+            with atomic_write(ivf_path, "wb") as f:
+                np.savez(f, centroids=centroids, assignments=assignments, trained_rows=np.asarray(trained_rows))
+        with atomic_write(meta_path) as f:
+            json.dump({key: view[key] for key in ("video_ids", "starts", "ends", "texts")}, f)
+        for segment in names:
+            self._remove_segment(segment)
+
+        with self._lock:
+            self._segments = {v: s for v, s in self._segments.items() if s not in names}
+            self._segment_rows = 0
+            self._snapshot_rows = len(view["video_ids"])
+            if self._version == version:
+                # Nothing changed in memory meanwhile: take over the rows other processes added
+                view.update(centroids=centroids, trained_rows=trained_rows, assignments=assignments)
+                self._apply(view)
+
+    def _apply(self, view):
+        self.vectors = view["vectors"]
+        self.video_ids = view["video_ids"]
+        self.starts = view["starts"]
+        self.ends = view["ends"]
+        self.texts = view["texts"]
+        self.centroids = view["centroids"]
+        self.trained_rows = view["trained_rows"]
+        self.assignments = view["assignments"]
+        if self.centroids is not None:
+            if self.assignments is None or len(self.assignments) != len(self.video_ids):
+                # Rows from segments get their cells here
+                assigned = 0 if self.assignments is None else len(self.assignments)
+                head = [] if self.assignments is None else [self.assignments]
+                self.assignments = np.concatenate(head + [self._assign(self.vectors[assigned:])])
+            self._rebuild_lists()
+
+    def _load(self):
+        with file_lock(self._lock_path):
+            view, _ = self._read_disk()
+        self._apply(view)
+        self._snapshot_rows = len(self.video_ids)
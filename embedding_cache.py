@@ -0,0 +1,110 @@
+# embedding_cache.py
+import hashlib
+import json
+import logging
+import os
+import time
+import numpy as np
+from file_utils import atomic_write
+from vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of per-video embedding matrices.
+    Each entry is a <key>.npy matrix (loaded memory-mapped, so nothing is copied until rows are touched)
+    plus a <key>.json file holding the chunk texts and start/end times.
+    The key covers the video id, the embedder name and the chunking parameters, so changing either
+    of the latter never serves stale vectors. The directory is kept under max_bytes by evicting
+    the least recently used entries.
+    """
+
+    def __init__(self, cache_dir='./cache/embeddings', max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(video_id, model_name, chunking):
+        raw = json.dumps({"video_id": video_id, "model": model_name, "chunking": chunking}, sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".npy", base + ".json"
+
+    def load(self, video_id, model_name, chunking):
+        """Returns a VectorStore backed by the memory-mapped matrix, or None on a miss."""
+        npy_path, meta_path = self._paths(self.key(video_id, model_name, chunking))
+        if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(npy_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning("Discarding unreadable entry for %s: %s", video_id, e)
+            self._remove(npy_path, meta_path)
+            return None
+
+        # Touch both files so eviction sees this entry as recently used
+        now = time.time()
+        for path in (npy_path, meta_path):
+            os.utime(path, (now, now))
+        logger.info("Loaded %d cached embeddings for %s.", len(meta["texts"]), video_id)
+        return VectorStore(matrix, meta["texts"], meta["starts"], meta.get("ends"), normalized=True)
+
+    def save(self, video_id, model_name, chunking, store):
+        key = self.key(video_id, model_name, chunking)
+        npy_path, meta_path = self._paths(key)
+        meta = {
+            "video_id": video_id,
+            "model": model_name,
+            "chunking": chunking,
+            "texts": [str(t) for t in store.texts],
+            "starts": [float(s) for s in store.starts],
+            "ends": [float(e) for e in store.ends],
+        }
+        # Each file is renamed into place once complete, so a crash never leaves a half-written entry behind
+        with atomic_write(npy_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(store.matrix, dtype=np.float32))
+        with atomic_write(meta_path) as f:
+            json.dump(meta, f)
+        self._evict(keep=key)
+
+    def _remove(self, *paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self, keep=None):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy"):
+                continue
+            key = name[:-len(".npy")]
+            npy_path, meta_path = self._paths(key)
+            try:
+                size = os.path.getsize(npy_path)
+                if os.path.exists(meta_path):
+                    size += os.path.getsize(meta_path)
+                last_used = os.path.getmtime(npy_path)
+            except OSError:
+                continue
+            entries.append((last_used, key, size))
+            total += size
+
+        entries.sort()
+        for _, key, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            logger.info("Evicting %s (%d bytes).", key, size)
+            self._remove(*self._paths(key))
+            total -= size
@@ -0,0 +1,78 @@
+# exports.py
+import json
+from contextlib import ExitStack
+from file_utils import atomic_write
+from text_utils import format_timestamp
+
+# Every export format, also used as its file extension; write_exports produces any subset of them
+EXPORT_FORMATS = ("txt", "srt", "vtt", "json")
+
+
+def _clock(seconds, separator):
+    millis = int(round(float(seconds) * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02}{separator}{millis:03}"
+
+
+def _cue_text(text):
+    # A blank line ends a cue in SRT/VTT, so captions must not contain one
+    return "\n".join(line for line in text.splitlines() if line.strip())
+
+
+def _txt(index, snippet, start, end):
+    return f"[{format_timestamp(start)}] {' '.join(snippet['text'].split())}\n"
+
+
+def _srt(index, snippet, start, end):
+    return f"{index + 1}\n{_clock(start, ',')} --> {_clock(end, ',')}\n{_cue_text(snippet['text'])}\n\n"
+
+
+def _vtt(index, snippet, start, end):
+    return f"{_clock(start, '.')} --> {_clock(end, '.')}\n{_cue_text(snippet['text'])}\n\n"
+
+
+def _json(index, snippet, start, end):
+    item = json.dumps({"start": start, "end": end, "text": snippet["text"]}, ensure_ascii=False)
+    return ("[\n" if index == 0 else ",\n") + item
+
+
+# Format -> (header, per-snippet formatter, footer); the JSON footer also closes an empty array
+_WRITERS = {
+    "txt": ("", _txt, ""),
+    "srt": ("", _srt, ""),
+    "vtt": ("WEBVTT\n\n", _vtt, ""),
+    "json": ("", _json, "\n]\n"),
+}
+
+
+def write_exports(transcript, files):
+    """
+    Writes the transcript in several formats in a single pass over the snippets.
+    :param transcript: List of snippets with "start", "text" and optionally "duration".
+    :param files: Dict of format (see EXPORT_FORMATS) -> open text file to write to.
+    """
+    for fmt, f in files.items():
+        f.write(_WRITERS[fmt][0])
+    count = 0
+    for index, snippet in enumerate(transcript):
+        start = float(snippet["start"])
+        end = start + float(snippet.get("duration", 0.0))
+        for fmt, f in files.items():
+            f.write(_WRITERS[fmt][1](index, snippet, start, end))
+        count = index + 1
+    for fmt, f in files.items():
+        footer = _WRITERS[fmt][2]
+        if fmt == "json" and count == 0:
+            footer = "[]\n"
+        f.write(footer)
+
+
+def export_transcript(transcript, base_path, formats=EXPORT_FORMATS):
+    """Writes <base_path>.<format> for each format, each file replaced atomically once complete."""
+    paths = {fmt: f"{base_path}.{fmt}" for fmt in formats}
+    with ExitStack() as stack:
+        files = {fmt: stack.enter_context(atomic_write(path)) for fmt, path in paths.items()}
+        write_exports(transcript, files)
+    return list(paths.values())
@@ -0,0 +1,59 @@
+# file_utils.py
+# File helpers shared by the on-disk caches and stores.
+import os
+import tempfile
+from contextlib import contextmanager
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+@contextmanager
+def atomic_write(path, mode="w", encoding=None):
+    """
+    Opens a new, uniquely named temporary file next to path; once the block exits cleanly it is renamed
+    over path. Readers therefore only ever see complete files, and concurrent writers of the same path
+    (threads or processes) never share a temporary file. On error path is left untouched.
+    """
+    if "b" not in mode and encoding is None:
+        encoding = "utf-8"
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock across processes (and threads, each opening the file anew), held for the block."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            f.seek(0)
+            while True:
+                try:
+                    # Blocks for up to 10 seconds per attempt
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -1,21 +1,81 @@
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
 from google import genai
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+import html
+from threading import Lock
+import json
+import logging
 import os
+import random
+import re
+import time
+from title_cache import TitleCache
+from text_utils import estimate_tokens, format_timestamp
+import metrics
 
 load_dotenv()
-api_key = os.getenv("API_KEY")
-if not api_key:
-    raise ValueError("API_KEY not found in environment variables. Please check your .env file.")
+logger = logging.getLogger(__name__)
 
-client = genai.Client(api_key=api_key)
+GEMINI_MODEL = "gemini-2.0-flash"
+MAX_CONCURRENT_REQUESTS = 8
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "240"))
+MAX_RETRIES = 3
+# Batched titling: consecutive chunks are packed into one prompt until either limit is reached
+TITLE_BATCH_TOKEN_BUDGET = 6000
+MAX_TITLES_PER_BATCH = 20
+# Titles starting with this stand in for segments Gemini could not title; they are never cached
+FAILED_TITLE_PREFIX = "(Failed to summarize"
 
-def format_timestamp(seconds):
-    seconds = int(seconds)
-    h = seconds // 3600
-    m = (seconds % 3600) // 60
-    s = seconds % 60
-    return f"{h:02d}:{m:02d}:{s:02d}" if h > 0 else f"{m:02d}:{s:02d}"
+TITLE_PROMPT = "Give a short 4–6 word title for this YouTube transcript segment. Be catchy, insightful, and concise. Just one title and no punctuation:\n\n{text}"
+BATCH_TITLE_PROMPT = (
+    "Below are {count} consecutive segments of a YouTube transcript, each starting with a [Segment N] marker.\n"
+    "Give each segment a short 4–6 word title. Be catchy, insightful, and concise, with no punctuation.\n"
+    "Respond with only a JSON array of exactly {count} strings, the titles in segment order.\n\n"
+    "{segments}"
+)
+
+_client = None
+_client_lock = Lock()
+_title_cache = None
+
+def get_client():
+    """Creates the Gemini client on first use, so importing this module needs no API key."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.getenv("API_KEY")
+            if not api_key:
+                raise ValueError("API_KEY not found in environment variables. Please check your .env file.")
+            _client = genai.Client(api_key=api_key)
+        return _client
+
+def get_title_cache():
+    """Shared on-disk title cache, opened on first use."""
+    global _title_cache
+    with _client_lock:
+        if _title_cache is None:
+            _title_cache = TitleCache()
+        return _title_cache
+
+def title_cache_key(text):
+    # Both templates are part of the key, so editing either prompt invalidates the cached titles
+    return TitleCache.make_key(GEMINI_MODEL, TITLE_PROMPT + BATCH_TITLE_PROMPT, text)
+
+class RateLimiter:
+    """Spaces request starts at least 60/requests_per_minute seconds apart, across all threads."""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
 def chunk_transcript(transcript, chunk_duration=60):
     chunks = []
@@ -32,34 +92,192 @@ def chunk_transcript(transcript, chunk_duration=60):
     chunks.append(current_chunk)
     return chunks
 
-def summarize_text(text):
+def _request(client, contents):
+    """One timed and counted Gemini call."""
+    with metrics.span("gemini_request"):
+        try:
+            response = client.models.generate_content(model=GEMINI_MODEL, contents=contents)
+        except Exception:
+            metrics.GEMINI_REQUESTS.inc(outcome="error")
+            raise
+    metrics.GEMINI_REQUESTS.inc(outcome="ok")
+    return response
+
+def _generate_title(text, client):
+    response = _request(client, TITLE_PROMPT.format(text=text))
+    return response.text.strip().strip('"')
+
+def _parse_titles(response_text, count):
+    """Parses the JSON array (or, failing that, a numbered list) of titles from a batch response."""
+    match = re.search(r"\[.*\]", response_text, re.DOTALL)
+    if match:
+        try:
+            titles = json.loads(match.group(0))
+            if isinstance(titles, list) and len(titles) == count and all(isinstance(t, str) for t in titles):
+                return [t.strip().strip('"') for t in titles]
+        except ValueError:
+            pass
+    lines = re.findall(r"^\s*\d+[.):]\s*(.+?)\s*$", response_text, re.MULTILINE)
+    if len(lines) == count:
+        return [line.strip('"') for line in lines]
+    raise ValueError(f"Expected {count} titles in batch response, could not parse: {response_text[:200]!r}")
+
+def _generate_titles(texts, client):
+    segments = "\n\n".join(f"[Segment {i + 1}]\n{text}" for i, text in enumerate(texts))
+    response = _request(client, BATCH_TITLE_PROMPT.format(count=len(texts), segments=segments))
+    return _parse_titles(response.text, len(texts))
+
+def _with_retries(call, rate_limiter, max_retries, backoff):
+    for attempt in range(max_retries + 1):
+        if rate_limiter:
+            rate_limiter.wait()
+        try:
+            return call()
+        except ValueError:
+            # Unparseable output is not a transient failure; let the caller fall back
+            raise
+        except Exception:
+            if attempt == max_retries:
+                raise
+            # Exponential backoff with jitter, so parallel workers don't retry in lockstep
+            time.sleep(backoff * (2 ** attempt) + random.uniform(0, backoff))
+
+def summarize_text(text, client=None, rate_limiter=None, max_retries=MAX_RETRIES, backoff=1.0):
+    client = client or get_client()
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=f"Give a short 4–6 word title for this YouTube transcript segment. Be catchy, insightful, and concise. Just one title and no punctuation:\n\n{text}",
-        )
-        return response.text.strip().strip('"')
+        return _with_retries(lambda: _generate_title(text, client), rate_limiter, max_retries, backoff)
     except Exception as e:
-        return f"(Failed to summarize: {e})"
+        return f"{FAILED_TITLE_PREFIX}: {e})"
 
-def get_transcript(video_id):
+def summarize_batch(texts, client=None, rate_limiter=None, max_retries=MAX_RETRIES, backoff=1.0):
+    """
+    Titles several segments with one request. If the response cannot be parsed into one title per segment,
+    falls back to one request per segment; if the request itself keeps failing, every segment gets a
+    failed title (retrying per segment would only multiply the requests during an outage).
+    """
+    client = client or get_client()
+    if len(texts) == 1:
+        return [summarize_text(texts[0], client, rate_limiter, max_retries, backoff)]
     try:
-        return YouTubeTranscriptApi.get_transcript(video_id)
-    except NoTranscriptFound:
-        try:
-            return YouTubeTranscriptApi.get_transcript(video_id, languages=['en'])
-        except:
-            return None
-    except TranscriptsDisabled:
-        return None
-
-def generate_summary_html(transcript, video_id):
-    from html_template import html_template
-    chunks = chunk_transcript(transcript)
-    transcript_lines = ""
+        return _with_retries(lambda: _generate_titles(texts, client), rate_limiter, max_retries, backoff)
+    except ValueError as e:
+        logger.warning("Could not parse batched titles of %d segments (%s). Falling back to per-segment requests.",
+                       len(texts), e)
+        return [summarize_text(text, client, rate_limiter, max_retries, backoff) for text in texts]
+    except Exception as e:
+        logger.warning("Batched titling of %d segments failed: %s", len(texts), e)
+        return [f"{FAILED_TITLE_PREFIX}: {e})"] * len(texts)
+
+def plan_title_batches(chunks, token_budget=TITLE_BATCH_TOKEN_BUDGET, max_batch_size=MAX_TITLES_PER_BATCH):
+    """Groups consecutive chunk texts into batches whose estimated size fits token_budget."""
+    batches = []
+    current = []
+    current_tokens = 0
     for chunk in chunks:
-        start = int(chunk["start"])
-        time_str = format_timestamp(start)
-        summary = summarize_text(chunk["text"])
-        transcript_lines += f'<div class="transcript-line"><a class="timestamp" onclick="seekTo({start})">[{time_str}]</a>{summary}</div>\n'
-    return html_template.format(video_id=video_id, transcript_lines=transcript_lines)
+        tokens = estimate_tokens(chunk["text"])
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(chunk["text"])
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def iter_chunk_titles(chunks, client=None, max_workers=MAX_CONCURRENT_REQUESTS,
+                      requests_per_minute=REQUESTS_PER_MINUTE, max_retries=MAX_RETRIES, backoff=1.0,
+                      batch_titles=True, token_budget=TITLE_BATCH_TOKEN_BUDGET, title_cache=None,
+                      use_title_cache=True, progress=None, rate_limiter=None):
+    """
+    Titles every chunk concurrently on a thread pool. Titles already in the title cache cost no request.
+    :param chunks: Chunks from chunk_transcript.
+    :param client: Gemini client (or any object with the same models.generate_content interface).
+    :param batch_titles: Pack consecutive chunks into one request each (see plan_title_batches).
+    :param title_cache: TitleCache to consult and fill; defaults to the shared on-disk cache.
+    :param progress: Optional callable(done, total) called as segments get their titles.
+    :param rate_limiter: RateLimiter shared with other concurrent titling runs; by default each run
+                         gets its own at requests_per_minute.
+    :return: Generator yielding the titles in chunk order, each as soon as it (and all before it) is ready.
+    """
+    keys = [title_cache_key(chunk["text"]) for chunk in chunks]
+    cached = {}
+    if use_title_cache:
+        title_cache = title_cache or get_title_cache()
+        cached = title_cache.get_many(keys)
+    # One request per distinct text: repeated segments (e.g. several "[Music]" minutes) share a title
+    missing = []
+    pending = set()
+    for chunk, key in zip(chunks, keys):
+        if key not in cached and key not in pending:
+            pending.add(key)
+            missing.append(chunk)
+    metrics.record_cache("title", True, len(chunks) - len(missing))
+    metrics.record_cache("title", False, len(missing))
+    logger.info("Title cache: %d of %d segments already titled.", len(chunks) - len(missing), len(chunks))
+    done = [len(chunks) - len(missing)]
+    done_lock = Lock()
+    if progress:
+        progress(done[0], len(chunks))
+
+    def title_batch(texts):
+        titles = summarize_batch(texts, client, rate_limiter, max_retries, backoff)
+        if progress:
+            with done_lock:
+                done[0] += len(texts)
+                progress(done[0], len(chunks))
+        return titles
+
+    if not missing:
+        for key in keys:
+            yield cached[key]
+        return
+
+    client = client or get_client()
+    rate_limiter = rate_limiter or RateLimiter(requests_per_minute)
+    if batch_titles:
+        batches = plan_title_batches(missing, token_budget)
+    else:
+        batches = [[chunk["text"]] for chunk in missing]
+    logger.info("Titling %d segments with %d requests.", len(missing), len(batches))
+
+    new_titles = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # map() yields results in submission order, whatever order the requests finish in
+            generated = (title for titles in executor.map(title_batch, batches) for title in titles)
+            for key in keys:
+                if key not in cached:
+                    title = next(generated)
+                    cached[key] = title
+                    if not title.startswith(FAILED_TITLE_PREFIX):
+                        new_titles[key] = title
+                yield cached[key]
+    finally:
+        if use_title_cache:
+            title_cache.put_many(new_titles)
+
+def summarize_chunks(chunks, **options):
+    """List version of iter_chunk_titles (same options): all titles, in chunk order."""
+    return list(iter_chunk_titles(chunks, **options))
+
+def summary_row(chunk, title):
+    """One chapter row of the summary page."""
+    start = int(chunk["start"])
+    return f'<div class="transcript-line"><a class="timestamp" onclick="seekTo({start})">[{format_timestamp(start)}]</a>{html.escape(title)}</div>\n'
+
+def iter_summary_html(transcript, video_id, client=None, max_workers=MAX_CONCURRENT_REQUESTS, batch_titles=True,
+                      title_cache=None, use_title_cache=True, progress=None):
+    """Yields the summary page in parts (head, one row per chapter as soon as it is titled, tail)."""
+    from html_template import render_summary_page
+    with metrics.span("chunking"):
+        chunks = chunk_transcript(transcript)
+    titles = iter_chunk_titles(chunks, client=client, max_workers=max_workers, batch_titles=batch_titles,
+                               title_cache=title_cache, use_title_cache=use_title_cache, progress=progress)
+
+    rows = (summary_row(chunk, title) for chunk, title in zip(chunks, titles))
+    return render_summary_page(video_id, rows)
+
+def generate_summary_html(transcript, video_id, **options):
+    """Whole summary page as one string; see iter_summary_html for the options."""
+    return "".join(iter_summary_html(transcript, video_id, **options))
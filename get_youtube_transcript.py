@@ -1,84 +1,125 @@
 # get_youtube_transcript.py
 
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-from HTMLtoTXT import convert_html_to_txt
+from exports import export_transcript
+from transcript_cache import TranscriptCache, MISS
+from text_utils import format_timestamp
+from contextlib import contextmanager
+from threading import Lock
+import html
+import logging
+import metrics
 import requests # Import requests for potential connection issues
 
+logger = logging.getLogger(__name__)
+_transcript_cache = TranscriptCache()
+_fetch_locks = {}  # video_id -> [lock, number of callers holding or waiting for it]
+_fetch_locks_guard = Lock()
+
 #Get Transcript for a video or, if not found, auto-generate
-def get_transcript(video_id):
+def _fetch_transcript(video_id):
+    """
+    Fetches the transcript from YouTube.
+    :return: (transcript, unavailable_reason). transcript is None on failure; unavailable_reason is set only
+             when the video definitely has no usable transcript (worth caching), not on transient errors.
+    """
     try:
         # Attempt to get transcript normally
-        print(f"Attempting to fetch transcript for video ID: {video_id}")
+        logger.info("Fetching transcript for video %s", video_id)
         transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        print(f"Successfully fetched transcript for video ID: {video_id}")
-        return transcript
+        logger.info("Fetched transcript for video %s", video_id)
+        return transcript, None
     except NoTranscriptFound:
-        print(f"No transcript found for {video_id} directly. Trying with 'en' language.")
+        logger.info("No transcript found for %s directly. Trying with 'en' language.", video_id)
         try:
             # Try with 'en' language explicitly
             transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['en'])
-            print(f"Successfully fetched English transcript for video ID: {video_id}")
-            return transcript
+            logger.info("Fetched English transcript for video %s", video_id)
+            return transcript, None
         except NoTranscriptFound:
-            print(f"No English transcript found for {video_id}.")
-            return None
+            logger.warning("No English transcript found for %s.", video_id)
+            return None, "no_transcript"
         except TranscriptsDisabled:
-            print(f"Transcripts are disabled for video {video_id} even for 'en'.")
-            return None
+            logger.warning("Transcripts are disabled for video %s even for 'en'.", video_id)
+            return None, "disabled"
         except requests.exceptions.ConnectionError as e:
-            print(f"Network error trying to fetch English transcript for {video_id}: {e}")
-            return None
+            logger.error("Network error trying to fetch English transcript for %s: %s", video_id, e)
+            return None, None
         except Exception as e:
-            print(f"Unexpected error fetching English transcript for {video_id}: {e}")
-            return None
+            logger.exception("Unexpected error fetching English transcript for %s: %s", video_id, e)
+            return None, None
     except TranscriptsDisabled:
-        print(f"Transcripts are disabled for video {video_id}.")
-        return None
+        logger.warning("Transcripts are disabled for video %s.", video_id)
+        return None, "disabled"
     except requests.exceptions.ConnectionError as e:
-        print(f"Network error trying to fetch transcript for {video_id}: {e}")
-        return None
+        logger.error("Network error trying to fetch transcript for %s: %s", video_id, e)
+        return None, None
     except Exception as e:
         # This catches the 'no element found' error or any other unhandled exceptions
-        print(f"Critical error fetching transcript for {video_id}: {e}")
-        return None
+        logger.exception("Critical error fetching transcript for %s: %s", video_id, e)
+        return None, None
+
+@contextmanager
+def _fetch_lock(video_id):
+    """Holds the per-video fetch lock; the lock is dropped once no caller holds or waits for it."""
+    with _fetch_locks_guard:
+        entry = _fetch_locks.setdefault(video_id, [Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _fetch_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _fetch_locks[video_id]
+
+#Get Transcript for a video, hitting YouTube only if it is not cached yet
+def get_transcript(video_id):
+    transcript = _transcript_cache.get(video_id)
+    metrics.record_cache("transcript", transcript is not MISS)
+    if transcript is not MISS:
+        return transcript
+
+    # One fetch per video, even when the summary pipeline and the chat ask for it at the same time
+    with _fetch_lock(video_id):
+        transcript = _transcript_cache.get(video_id)
+        if transcript is not MISS:
+            return transcript
+
+        with metrics.span("transcript_fetch"):
+            transcript, unavailable_reason = _fetch_transcript(video_id)
+        if transcript is not None:
+            _transcript_cache.put(video_id, transcript)
+        elif unavailable_reason:
+            _transcript_cache.put_unavailable(video_id, unavailable_reason)
+        return transcript
 
 #Update the transcript
 def update_transcript_html(video_id):
     transcript = get_transcript(video_id)
     if transcript is None:
-        print(f"No transcript found for video {video_id}")
+        logger.warning("No transcript found for video %s", video_id)
         return False
 
-    html_content = generate_html_transcript(transcript, video_id)
-
     # Overwrite the transcript.html file
     with open("transcript.html", "w", encoding="utf-8") as f:
-        f.write(html_content)
+        f.writelines(iter_html_transcript(transcript, video_id))
 
-    # Convert the updated HTML to transcript.txt
-    convert_html_to_txt()
+    # transcript.txt/.srt/.vtt/.json straight from the snippets
+    export_transcript(transcript, "transcript")
 
-    print(f"Transcript files updated for video {video_id}")
+    logger.info("Transcript files updated for video %s", video_id)
     return True
 
 
 
 
 
-#Timestamp format
-def format_timestamp(seconds):
-    seconds = int(seconds)
-    h = seconds // 3600
-    m = (seconds % 3600) // 60
-    s = seconds % 60
-    if h > 0:
-        return f"{h:02d}:{m:02d}:{s:02d}"
-    else:
-        return f"{m:02d}:{s:02d}"
-
 #Generate HTML with clickable timestamps
-def generate_html_transcript(transcript, video_id):
-    html_content = f"""<!DOCTYPE html>
+def iter_html_transcript(transcript, video_id):
+    """Yields the full transcript page in parts (head, one line per snippet, tail), escaping the snippet text."""
+    yield f"""<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8" />
@@ -123,10 +164,10 @@ def generate_html_transcript(transcript, video_id):
     for snippet in transcript:
         start = int(snippet['start'])
         time_str = format_timestamp(start)
-        text = snippet['text']
-        html_content += f'<div class="transcript-line"><a class="timestamp" onclick="seekTo({start})">[{time_str}]</a>{text}</div>\n'
+        text = html.escape(snippet['text'])
+        yield f'<div class="transcript-line"><a class="timestamp" onclick="seekTo({start})">[{time_str}]</a>{text}</div>\n'
 
-    html_content += f"""
+    yield f"""
   </div>
   <div class="video">
     <div id="player"></div>
@@ -163,4 +204,6 @@ def generate_html_transcript(transcript, video_id):
 </body>
 </html>
 """
-    return html_content
+
+def generate_html_transcript(transcript, video_id):
+    return "".join(iter_html_transcript(transcript, video_id))
@@ -19,6 +19,7 @@ html_template = """<!DOCTYPE html>
     width: 100%;
   }}
   .main-topics {{
+    order: -1;
     flex: 0 0 400px;
     background: #ffcce1;
     padding: 15px;
@@ -85,6 +86,14 @@ html_template = """<!DOCTYPE html>
     white-space: pre-wrap;
     border-radius: 8px;
   }}
+  #chatlog a.timestamp {{
+    color: #007bff;
+    text-decoration: none;
+    cursor: pointer;
+  }}
+  #chatlog a.timestamp:hover {{
+    text-decoration: underline;
+  }}
   #chatInput {{
     width: 75%;
     padding: 10px;
@@ -112,11 +121,6 @@ html_template = """<!DOCTYPE html>
 <body>
 
 <div class="wrapper">
-  <div class="main-topics">
-    <h2>Main Topics</h2>
-    {transcript_lines}
-  </div>
-
   <div class="main-video">
     <div id="player"></div>
 
@@ -127,7 +131,6 @@ html_template = """<!DOCTYPE html>
       <button id="sendBtn">Send</button>
     </div>
   </div>
-</div>
 <script>
   var player;
 
@@ -154,26 +157,53 @@ html_template = """<!DOCTYPE html>
   var firstScriptTag = document.getElementsByTagName('script')[0];
   firstScriptTag.parentNode.insertBefore(tag, firstScriptTag);
 
-  document.addEventListener("DOMContentLoaded", function() {{
+  // Runs right away (the chat markup is above), so chat works while chapter rows are still streaming in
+  (function() {{
     const input = document.getElementById("chatInput");
     const button = document.getElementById("sendBtn");
     const chatlog = document.getElementById("chatlog");
 
+    // Turns [mm:ss] / [h:mm:ss] citations in an answer into links that seek the player
+    function linkTimestamps(element) {{
+      const text = element.textContent;
+      const pattern = /\\[(?:(\\d+):)?(\\d{{1,2}}):(\\d{{2}})\\]/g;
+      element.textContent = "";
+      let last = 0;
+      let match;
+      while ((match = pattern.exec(text)) !== null) {{
+        element.appendChild(document.createTextNode(text.slice(last, match.index)));
+        const seconds = parseInt(match[1] || "0") * 3600 + parseInt(match[2]) * 60 + parseInt(match[3]);
+        const link = document.createElement("a");
+        link.className = "timestamp";
+        link.textContent = match[0];
+        link.onclick = function() {{ seekTo(seconds); }};
+        element.appendChild(link);
+        last = pattern.lastIndex;
+      }}
+      element.appendChild(document.createTextNode(text.slice(last)));
+    }}
+
     async function sendMessage() {{
       const question = input.value.trim();
       if (!question) return;
 
-      chatlog.innerHTML += "\\nYou: " + question;
+      // Append nodes rather than rewriting innerHTML, which would detach an answer still being streamed
+      chatlog.appendChild(document.createTextNode("\\nYou: " + question));
       input.value = "";
 
+      // The answer is streamed from /chat/stream as Server-Sent Events and rendered token by token
+      chatlog.appendChild(document.createTextNode("\\nAI: "));
+      const answer = document.createElement("span");
+      chatlog.appendChild(answer);
+
       try {{
-        const res = await fetch('/chat', {{
+        const res = await fetch('/chat/stream', {{
           method: 'POST',
           headers: {{
             'Content-Type': 'application/json'
           }},
           body: JSON.stringify({{
-            question: question, // <--- CRITICAL FIX 1: Changed 'message' to 'question'
+            question: question,
             video_id: '{video_id}'
           }})
         }});
@@ -183,12 +213,32 @@ html_template = """<!DOCTYPE html>
             throw new Error(`HTTP error! Status: ${{res.status}}, Details: ${{errorText}}`);
         }}
 
-        const data = await res.json();
-        chatlog.innerHTML += "\\nAI: " + data.answer; // <--- CRITICAL FIX 2: Changed 'data.response' to 'data.answer'
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        while (true) {{
+          const {{ value, done }} = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, {{ stream: true }});
+
+          // Events are separated by a blank line; keep any incomplete event in the buffer
+          const events = buffer.split("\\n\\n");
+          buffer = events.pop();
+          for (const event of events) {{
+            if (event.startsWith("event: done")) continue;
+            for (const line of event.split("\\n")) {{
+              if (line.startsWith("data: ")) {{
+                answer.textContent += JSON.parse(line.slice(6)).token || "";
+              }}
+            }}
+          }}
+          chatlog.scrollTop = chatlog.scrollHeight;
+        }}
       }} catch (err) {{
         console.error("Fetch error:", err); // Log the actual error
-        chatlog.innerHTML += `\\nAI: (Error processing your request: ${{err.message || err}}`; // Display error to user
+        answer.textContent += `(Error processing your request: ${{err.message || err}}`; // Display error to user
       }}
+      linkTimestamps(answer);
       chatlog.scrollTop = chatlog.scrollHeight;
     }}
 
@@ -198,8 +248,26 @@ html_template = """<!DOCTYPE html>
         sendMessage();
       }}
     }});
-  }});
+  }})();
 </script>
+
+  <!-- Last in the page so it can be streamed row by row; shown first via CSS order -->
+  <div class="main-topics">
+    <h2>Main Topics</h2>
+    {transcript_lines}
+  </div>
+</div>
 </body>
 </html>
 """
+
+# The page split around the chapter rows, so it can be written and served row by row
+summary_page_head, summary_page_tail = html_template.split("{transcript_lines}")
+
+
+def render_summary_page(video_id, rows):
+    """Yields the summary page in parts: head, then each row from rows as it arrives, then the tail."""
+    yield summary_page_head.format(video_id=video_id)
+    for row in rows:
+        yield row
+    yield summary_page_tail.format(video_id=video_id)
@@ -0,0 +1,172 @@
+# inference_scheduler.py
+import queue
+import time
+from threading import Event, Lock, Thread
+
+
+class SchedulerBusy(Exception):
+    """Raised when the request queue is full; the caller should retry later."""
+
+
+class InferenceTimeout(Exception):
+    """Raised when a request did not finish within its timeout."""
+
+
+# Marks the end of a streamed response in a request's token queue
+_END_OF_STREAM = object()
+
+
+class _Request:
+    def __init__(self, fn, stream, key):
+        self.fn = fn
+        self.stream = stream
+        self.key = key
+        self.result = None
+        self.error = None
+        self.done = Event()
+        self.cancelled = False
+        self.waiters = 0
+        self.enqueued = time.monotonic()
+        self.tokens = queue.Queue() if stream else None
+
+
+class InferenceScheduler:
+    """
+    Serializes all access to one llama_cpp model on a dedicated worker thread.
+    Requests wait in a bounded queue; when it is full, submit() raises SchedulerBusy instead of piling up
+    more work. llama.cpp decodes a single sequence per context, so instead of true batching, identical
+    non-streaming requests (same key) waiting in the queue share one generation.
+    """
+
+    def __init__(self, llm, max_queue=8, timeout=120.0):
+        self.llm = llm
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}
+        self._lock = Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.coalesced = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._worker = Thread(target=self._run, name="llm-worker", daemon=True)
+        self._worker.start()
+
+    def _enqueue(self, request):
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise SchedulerBusy(f"Inference queue is full ({self._queue.maxsize} requests waiting).")
+
+    def submit(self, fn, key=None, timeout=None):
+        """
+        Runs fn(llm) on the worker and returns its result.
+        :param key: Optional request identity (e.g. the prompt). A queued request with the same key is reused.
+        :raises SchedulerBusy: if the queue is full.
+        :raises InferenceTimeout: if no result arrived within timeout (default self.timeout) seconds.
+        """
+        with self._lock:
+            request = self._pending.get(key) if key is not None else None
+            # A cancelled request is never run, so a retry of the same prompt must not wait on it
+            is_new = request is None or request.cancelled
+            if is_new:
+                request = _Request(fn, stream=False, key=key)
+                if key is not None:
+                    self._pending[key] = request
+            else:
+                self.coalesced += 1
+            request.waiters += 1
+        if is_new:
+            try:
+                self._enqueue(request)
+            except SchedulerBusy:
+                with self._lock:
+                    self._pending.pop(key, None)
+                raise
+
+        if not request.done.wait(timeout or self.timeout):
+            with self._lock:
+                self.timed_out += 1
+                request.waiters -= 1
+                # Only drop the work if nobody else is still waiting for it
+                if request.waiters == 0:
+                    request.cancelled = True
+                    if self._pending.get(request.key) is request:
+                        del self._pending[request.key]
+            raise InferenceTimeout("Timed out waiting for the language model.")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def stream(self, fn, timeout=None):
+        """
+        Queues fn(llm), which must return an iterator (e.g. create_completion(stream=True)), and returns a
+        generator over its items. Enqueueing happens immediately, so SchedulerBusy is raised here rather
+        than on first iteration. Closing the generator early stops generation after the current item.
+        """
+        request = _Request(fn, stream=True, key=None)
+        self._enqueue(request)
+        return self._iter_stream(request, timeout or self.timeout)
+
+    def _iter_stream(self, request, timeout):
+        try:
+            while True:
+                try:
+                    item = request.tokens.get(timeout=timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timed_out += 1
+                    raise InferenceTimeout("Timed out waiting for the language model.")
+                if item is _END_OF_STREAM:
+                    break
+                yield item
+            if request.error is not None:
+                raise request.error
+        finally:
+            request.cancelled = True
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            with self._lock:
+                if request.key is not None and self._pending.get(request.key) is request:
+                    del self._pending[request.key]
+            if request.cancelled:
+                continue
+
+            wait = time.monotonic() - request.enqueued
+            with self._lock:
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            try:
+                if request.stream:
+                    for item in request.fn(self.llm):
+                        if request.cancelled:
+                            break
+                        request.tokens.put(item)
+                else:
+                    request.result = request.fn(self.llm)
+            except Exception as e:
+                request.error = e
+            finally:
+                if request.stream:
+                    request.tokens.put(_END_OF_STREAM)
+                request.done.set()
+                with self._lock:
+                    self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "coalesced": self.coalesced,
+                "avg_wait_seconds": self.total_wait / self.completed if self.completed else 0.0,
+                "max_wait_seconds": self.max_wait,
+            }
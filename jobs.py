@@ -0,0 +1,107 @@
+# jobs.py
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """State of one background video-processing job. Updated by the worker, read by the GUI and Flask."""
+
+    def __init__(self, video_id):
+        self.id = uuid.uuid4().hex[:12]
+        self.video_id = video_id
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = "Waiting for a free worker"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = Lock()
+
+    def update(self, progress, message):
+        with self._lock:
+            self.progress = progress
+            self.message = message
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "video_id": self.video_id,
+                "status": self.status,
+                "progress": round(self.progress, 3),
+                "message": self.message,
+                "result": self.result,
+                "error": self.error,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+            }
+
+
+class JobManager:
+    """Runs submitted jobs on a worker pool and keeps their state for polling."""
+
+    def __init__(self, max_workers=2, max_finished_jobs=100):
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = Lock()
+
+    def submit(self, video_id, func):
+        """
+        Queues func(video_id, progress) to run on the pool, unless a job for video_id is already queued
+        or running: then that job is returned instead, so two jobs never write the same video's output.
+        :param func: Callable doing the work; progress is a callable(fraction, message) it may report through.
+                     Its return value becomes job.result, and an exception marks the job failed.
+        :return: The new (or in-flight) Job.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.video_id == video_id and not job.done:
+                    return job
+            job = Job(video_id)
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(self, job, func):
+        job.status = "running"
+        job.started = time.time()
+        job.update(0.0, "Started")
+        try:
+            job.result = func(job.video_id, job.update)
+            job.update(1.0, "Done")
+            job.status = "done"
+        except Exception as e:
+            logger.exception("Job %s for video %s failed: %s", job.id, job.video_id, e)
+            job.error = str(e)
+            job.update(job.progress, "Failed")
+            job.status = "failed"
+        finally:
+            job.finished = time.time()
+
+    def _forget_old_jobs(self):
+        finished = [job for job in self._jobs.values() if job.done]
+        finished.sort(key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.id]
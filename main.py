@@ -1,20 +1,41 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import messagebox
-import re
 import webbrowser
 import os
+import logging
 import requests
-from flask import Flask, request, jsonify, send_file
+import json
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from threading import Thread
 from get_youtube_transcript import get_transcript, update_transcript_html
-from gemini_intergration import generate_summary_html
-from chatbox import ChatHandler
+from text_utils import format_timestamp
+from chatbox import ChatHandler, ModelNotReady
+from inference_scheduler import SchedulerBusy, InferenceTimeout
+from jobs import JobManager
+from pipeline import process_video, get_live_page, extract_video_id
+from artifact_store import ARTIFACTS, get_artifact_store
+import metrics
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 #Global Chathandler Instance
 global_chat_handler = None
 
+#Background workers for URL processing, so the Tk main loop never blocks
+job_manager = JobManager(max_workers=2)
+artifact_store = get_artifact_store()
+JOB_POLL_INTERVAL_MS = 500
+opened_jobs = set()  # Jobs whose page the GUI already opened in the browser
+polled_jobs = set()  # Jobs the GUI is polling, so resubmitting a video does not poll its job twice
+MODEL_POLL_INTERVAL_MS = 1000
+
+#Seconds from process start until the GUI and Flask were up (set in __main__)
+startup_seconds = None
 
 
 def ask_question(question):
@@ -24,9 +45,17 @@ def ask_question(question):
         data = response.json()
         return data.get("answer", "(No answer)")
     except Exception as e:
-        print(f"Error in ask_question (GUI wrapper): {e}")
+        logger.warning("Error in ask_question (GUI wrapper): %s", e)
         return "(Error processing your request)"
 
+def warming_up_response():
+    status = global_chat_handler.status()
+    if status["state"] == "error":
+        return jsonify({"answer": f"(The AI failed to load: {status['error']})", "status": "error"}), 500
+    return jsonify({"answer": "(The AI is still warming up. Please try again in a moment.)", "status": "warming_up"}), \
+        503, {"Retry-After": "10"}
+
+
 # Flask Routes
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -42,17 +71,156 @@ def chat():
 
         return jsonify({"answer": "Error: AI not initialized. Please restart the application."})
 
-    response = global_chat_handler.ask_question(question, video_id, get_transcript)
+    try:
+        response = global_chat_handler.ask_question(question, video_id, get_transcript)
+    except ModelNotReady:
+        return warming_up_response()
+    except SchedulerBusy:
+        return jsonify({"answer": "(The AI is busy answering other questions. Please try again shortly.)"}), 503, \
+            {"Retry-After": "5"}
+    except InferenceTimeout:
+        return jsonify({"answer": "(The AI took too long to respond. Please try again.)"}), 504
 
     return jsonify({"answer": response})
 
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Server-Sent Events version of /chat: one 'data:' event per generated piece, then a 'done' event."""
+    data = request.get_json()
+    question = data.get("question")
+    video_id = str(data.get("video_id", "")).strip()
+
+    def sse(pieces):
+        for piece in pieces:
+            yield f"data: {json.dumps({'token': piece})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    if not video_id:
+        pieces = ["Error: Missing video ID."]
+    elif global_chat_handler is None:
+        pieces = ["Error: AI not initialized. Please restart the application."]
+    else:
+        try:
+            pieces = global_chat_handler.ask_question_stream(question, video_id, get_transcript)
+        except ModelNotReady:
+            return warming_up_response()
+        except SchedulerBusy:
+            return jsonify({"answer": "(The AI is busy answering other questions. Please try again shortly.)"}), 503, \
+                {"Retry-After": "5"}
+
+    return Response(stream_with_context(sse(pieces)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/chat/stats')
+def chat_stats():
+    if global_chat_handler is None:
+        return jsonify({"error": "AI not initialized"}), 503
+    scheduler = global_chat_handler.scheduler
+    return jsonify({
+        "inference": scheduler.stats() if scheduler else None,
+        "contexts": global_chat_handler.contexts.stats(),
+        "prompt_prefixes": global_chat_handler.prefix_cache.stats(),
+        "answers": global_chat_handler.answer_cache.stats(),
+    })
+
+
+@app.route('/search')
+def search():
+    """Searches all processed videos: /search?q=<text>&k=<hits>. Returns video_id + timestamp hits."""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing query parameter 'q'."}), 400
+    if global_chat_handler is None:
+        return jsonify({"error": "AI not initialized"}), 503
+    top_n = min(max(request.args.get("k", 10, type=int), 1), 100)
+
+    try:
+        started = time.perf_counter()
+        hits = global_chat_handler.search_videos(query, top_n)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    except ModelNotReady:
+        return warming_up_response()
+
+    for hit in hits:
+        hit["timestamp"] = format_timestamp(hit["start"])
+        hit["url"] = f"https://www.youtube.com/watch?v={hit['video_id']}&t={int(hit['start'])}s"
+    return jsonify({"query": query, "hits": hits, "took_ms": round(elapsed_ms, 2)})
+
+
+@app.route('/health')
+def health():
+    """Readiness probe: 200 once the embedder and LLM are loaded, 503 while warming up or after a load error."""
+    models = global_chat_handler.status() if global_chat_handler else {"state": "cold"}
+    body = {
+        "status": "ok" if models["state"] == "ready" else models["state"],
+        "models": models,
+        "startup_seconds": startup_seconds,
+        "uptime_seconds": time.perf_counter() - STARTUP_STARTED,
+    }
+    return jsonify(body), 200 if models["state"] == "ready" else 503
+
+
+def _scheduler_stat(name):
+    return global_chat_handler.scheduler.stats()[name]
+
+
+# Read from the live objects whenever /metrics is scraped (skipped while the LLM is not loaded)
+metrics.REGISTRY.gauge("video_analysis_inference_queue_depth", "Questions waiting for the LLM.",
+                       fn=lambda: _scheduler_stat("queue_depth"))
+metrics.REGISTRY.gauge("video_analysis_warm_contexts", "Videos whose chat context is in memory.",
+                       fn=lambda: global_chat_handler.contexts.stats()["videos"])
+metrics.REGISTRY.gauge("video_analysis_jobs_running", "Summary jobs currently running.",
+                       fn=lambda: sum(job.status == "running" for job in job_manager.jobs()))
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Stage timings, cache hit/miss counters, queue depth and generation speed in Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def send_artifact(video_id, name):
+    """Serves a stored artifact with ETag/Last-Modified validation, gzip-compressed when the client accepts it."""
+    try:
+        # Absolute, since Flask resolves relative paths against the app directory rather than the working directory
+        path = os.path.abspath(artifact_store.path(video_id, name))
+    except ValueError:
+        return "Not found", 404
+    if not os.path.exists(path):
+        return "Transcript not found", 404
+    mimetype = ARTIFACTS[name]
+    gz_path = path + ".gz"
+    if "gzip" in request.accept_encodings and os.path.exists(gz_path):
+        response = send_file(gz_path, mimetype=mimetype, conditional=True, max_age=0)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=0)
+    response.vary.add("Accept-Encoding")
+    return response
+
+
 @app.route('/video/<video_id>')
 def serve_transcript(video_id):
-    filename = 'smart_transcript.html'
-    if not os.path.exists(filename):
-        return "Transcript not found", 404
-    return send_file(filename)
+    page = get_live_page(video_id)
+    if page is not None:
+        # Still being titled: stream the chapters that are done and the rest as they come
+        return Response(stream_with_context(page.stream()), mimetype='text/html')
+    return send_artifact(video_id, "summary.html")
+
+
+@app.route('/video/<video_id>/<name>')
+def serve_video_artifact(video_id, name):
+    return send_artifact(video_id, name)
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
 
 
 # Run Flask
@@ -60,12 +228,6 @@ def run_flask():
     app.run(debug=False, use_reloader=False)
 
 
-# GUI to extract video ID
-def extract_video_id(url):
-    match = re.search(r"(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})", url)
-    return match.group(1) if match else None
-
-
 # When user submits URL
 def process_url():
     url = url_entry.get()
@@ -74,45 +236,100 @@ def process_url():
         messagebox.showerror("Invalid URL", "Please enter a valid YouTube video URL.")
         return
 
-    # Update transcript file and generate HTML summary
-    transcript = get_transcript(video_id)
-    if transcript is None:
-        messagebox.showerror("No Transcript", "Could not retrieve transcript.")
+    # Transcript fetching, titling and file writing run on a worker; the GUI only polls
+    job = job_manager.submit(
+        video_id, lambda video_id, progress: process_video(video_id, progress, chat_handler=global_chat_handler)
+    )
+    if job.id in polled_jobs:
         return
+    polled_jobs.add(job.id)
+    status_label.config(text=f"{video_id}: queued")
+    root.after(JOB_POLL_INTERVAL_MS, poll_job, job.id)
+
+
+# Poll a job from the Tk main loop until it finishes
+def poll_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        polled_jobs.discard(job_id)
+        return
+    status = job.to_dict()
+    status_label.config(text=f"{job.video_id}: {status['message']} ({int(status['progress'] * 100)}%)")
+
+    # Open the page as soon as its first chapters are streaming, or once the job is done
+    if job_id not in opened_jobs and (job.status == "done" or get_live_page(job.video_id) is not None):
+        opened_jobs.add(job_id)
+        webbrowser.open(f"http://127.0.0.1:5000/video/{job.video_id}")
+    if job.status == "failed":
+        messagebox.showerror("Processing Failed", f"Could not process video {job.video_id}: {job.error}")
+    elif job.status == "done" and job.result["problems"]:
+        # Submitting the video again retries what is missing
+        status_label.config(text=f"{job.video_id}: Done, but {'; '.join(job.result['problems'])}")
+    if job.status in ("done", "failed"):
+        opened_jobs.discard(job_id)
+        polled_jobs.discard(job_id)
+    else:
+        root.after(JOB_POLL_INTERVAL_MS, poll_job, job_id)
+
 
-    html = generate_summary_html(transcript, video_id)
-    filename = "smart_transcript.html"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(html)
+# Show model loading progress in the GUI until the models are ready (or failed)
+def poll_model_status():
+    status = global_chat_handler.status()
+    if status["state"] == "error":
+        messagebox.showerror("Initialization Error",
+                             f"Failed to load AI model: {status['error']}\nCheck model path and resources.")
+        model_label.config(text="AI failed to load")
+    elif status["state"] == "ready":
+        model_label.config(text="AI ready")
+    else:
+        model_label.config(text="Loading AI models in the background...")
+        root.after(MODEL_POLL_INTERVAL_MS, poll_model_status)
 
-    webbrowser.open(f"http://127.0.0.1:5000/video/{video_id}")
 
+# GUI setup; done in build_gui() so that importing this module (e.g. for benchmarks) needs no display
+root = None
+url_entry = None
+status_label = None
+model_label = None
 
-# GUI setup
-root = tk.Tk()
-root.title("Multimodal Video Analysis")
-root.geometry("400x200")
-root.configure(bg="#f0f8ff")
 
-label = tk.Label(root, text="Enter YouTube Video URL:", bg="#f0f8ff", font=("Arial", 12))
-label.pack(pady=20)
+def build_gui():
+    global root, url_entry, status_label, model_label
+    root = tk.Tk()
+    root.title("Multimodal Video Analysis")
+    root.geometry("400x240")
+    root.configure(bg="#f0f8ff")
 
-url_entry = tk.Entry(root, width=50)
-url_entry.pack()
+    label = tk.Label(root, text="Enter YouTube Video URL:", bg="#f0f8ff", font=("Arial", 12))
+    label.pack(pady=20)
+
+    url_entry = tk.Entry(root, width=50)
+    url_entry.pack()
+
+    submit_btn = tk.Button(root, text="Submit", command=process_url, bg="#007bff", fg="white", font=("Arial", 11))
+    submit_btn.pack(pady=20)
+
+    status_label = tk.Label(root, text="", bg="#f0f8ff", font=("Arial", 10))
+    status_label.pack()
+
+    model_label = tk.Label(root, text="", bg="#f0f8ff", font=("Arial", 9))
+    model_label.pack()
+    return root
 
-submit_btn = tk.Button(root, text="Submit", command=process_url, bg="#007bff", fg="white", font=("Arial", 11))
-submit_btn.pack(pady=20)
 
 if __name__ == '__main__':
-    try:
-        global_chat_handler = ChatHandler()
-        print("Global ChatHandler (and LLM/Embedder) initialized successfully.")
-    except Exception as e:
-        print(f"Failed to initialize global ChatHandler (and LLM/Embedder) at startup: {e}")
-        messagebox.showerror("Initialization Error", f"Failed to load AI model: {e}\nCheck model path and resources.")
-        exit()
+    # Constructing the handler is cheap; the embedder and LLM load on a background thread while the
+    # GUI and Flask are already usable. /chat answers "warming up" until then, /health reports readiness.
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    global_chat_handler = ChatHandler()
+    global_chat_handler.start_loading()
 
     flask_thread = Thread(target=run_flask, daemon=True)
     flask_thread.start()
+    build_gui()
 
+    startup_seconds = time.perf_counter() - STARTUP_STARTED
+    logger.info("GUI and Flask server started in %.2fs (models still loading in the background).", startup_seconds)
+    root.after(0, poll_model_status)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,183 @@
+# pipeline.py
+import json
+import logging
+import re
+from contextlib import ExitStack
+from threading import Condition, Lock
+from get_youtube_transcript import get_transcript, iter_html_transcript
+from exports import EXPORT_FORMATS, write_exports
+from gemini_intergration import FAILED_TITLE_PREFIX, chunk_transcript, iter_chunk_titles, summary_row
+from html_template import render_summary_page
+from artifact_store import ARTIFACTS, get_artifact_store
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LivePage:
+    """
+    A page that is still being generated. The pipeline appends parts as they are produced and
+    any number of readers can stream it from the start, blocking until the next part (or the end) arrives.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self._changed = Condition()
+
+    def append(self, part):
+        with self._changed:
+            self.parts.append(part)
+            self._changed.notify_all()
+
+    def finish(self):
+        with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    def stream(self):
+        sent = 0
+        while True:
+            with self._changed:
+                while sent == len(self.parts) and not self.done:
+                    self._changed.wait()
+                new_parts = self.parts[sent:]
+                finished = self.done
+            for part in new_parts:
+                yield part
+            sent += len(new_parts)
+            if finished and sent == len(self.parts):
+                return
+
+
+_live_pages = {}
+_live_pages_lock = Lock()
+
+
+def get_live_page(video_id):
+    """The LivePage of a summary currently being generated for video_id, or None."""
+    with _live_pages_lock:
+        return _live_pages.get(video_id)
+
+
+def extract_video_id(url):
+    """The 11-character video id from a YouTube URL (watch?v= or youtu.be/) or a bare id, else None."""
+    match = re.search(r"(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})", url)
+    if match:
+        return match.group(1)
+    url = url.strip()
+    return url if re.fullmatch(r"[a-zA-Z0-9_-]{11}", url) else None
+
+
+def _chapter_list(chunks, titles, transcript):
+    """Chapters as JSON-ready dicts; each one ends where the next begins (the last one with the transcript)."""
+    last = transcript[-1]
+    video_end = last["start"] + last.get("duration", 0.0)
+    ends = [chunk["start"] for chunk in chunks[1:]] + [video_end]
+    return [{"start": chunk["start"], "end": end, "title": title}
+            for chunk, end, title in zip(chunks, ends, titles)]
+
+
+def _is_processed(artifact_store, video_id):
+    """Whether every artifact of video_id exists and all its chapters got a real title (failed ones are retried)."""
+    if not all(artifact_store.exists(video_id, name) for name in ARTIFACTS):
+        return False
+    try:
+        chapters = json.loads(artifact_store.read(video_id, "chapters.json"))
+    except (OSError, ValueError) as e:
+        logger.warning("Unreadable chapter list for %s, reprocessing: %s", video_id, e)
+        return False
+    return not any(chapter["title"].startswith(FAILED_TITLE_PREFIX) for chapter in chapters)
+
+
+def process_video(video_id, progress=None, chat_handler=None, artifact_store=None, force=False, rate_limiter=None):
+    """
+    Runs the full summary pipeline for one video: fetch transcript, title chapters, write the video's
+    artifacts (see artifact_store.ARTIFACTS), and (given a chat_handler) index the transcript for chat
+    and cross-video search. Meant to run on a worker thread (see jobs.JobManager); it never touches the GUI.
+    :param progress: Optional callable(fraction, message) for status reporting.
+    :param artifact_store: Where the artifacts go; defaults to the shared store.
+    :param force: Regenerate the artifacts even if the video was processed before. Videos with
+                  chapters that failed to get a title are always reprocessed.
+    :param rate_limiter: Gemini RateLimiter shared by videos processed in parallel (see batch_cli).
+    :return: Dict with the path of the summary page ("summary") and a list of what went wrong without
+             stopping the job ("problems": untitled chapters, a failed chat/search index); an empty list
+             means the video is completely processed.
+    """
+    def report(fraction, message):
+        if progress:
+            progress(fraction, message)
+
+    artifact_store = artifact_store or get_artifact_store()
+    report(0.05, "Fetching transcript")
+    transcript = get_transcript(video_id)
+    if transcript is None:
+        raise RuntimeError("Could not retrieve transcript.")
+
+    # Build the chat/search index while the chapters are being titled, so the first question finds it ready
+    indexing = chat_handler.index_video_async(video_id, transcript) if chat_handler is not None else None
+
+    if force or not _is_processed(artifact_store, video_id):
+        report(0.08, "Writing transcript files")
+        with artifact_store.writer(video_id, "transcript.html") as f:
+            f.writelines(iter_html_transcript(transcript, video_id))
+        with ExitStack() as stack:
+            files = {fmt: stack.enter_context(artifact_store.writer(video_id, f"transcript.{fmt}"))
+                     for fmt in EXPORT_FORMATS}
+            write_exports(transcript, files)
+
+        def titling_progress(done, total):
+            # Titling is the long part of the job: map it onto 10%..90%
+            report(0.1 + 0.8 * done / max(total, 1), f"Titled {done}/{total} chapters")
+
+        report(0.1, "Titling chapters")
+        with metrics.span("chunking"):
+            chunks = chunk_transcript(transcript)
+        titles = []
+
+        def rows():
+            titled = iter_chunk_titles(chunks, progress=titling_progress, rate_limiter=rate_limiter)
+            for chunk, title in zip(chunks, titled):
+                titles.append(title)
+                yield summary_row(chunk, title)
+
+        # Each chapter row goes to the file and to live readers of /video/<video_id> as soon as it is titled
+        page = LivePage()
+        with _live_pages_lock:
+            _live_pages[video_id] = page
+        try:
+            with artifact_store.writer(video_id, "summary.html") as f:
+                for part in render_summary_page(video_id, rows()):
+                    f.write(part)
+                    page.append(part)
+        finally:
+            page.finish()
+            with _live_pages_lock:
+                if _live_pages.get(video_id) is page:
+                    del _live_pages[video_id]
+
+        report(0.9, "Writing chapter list")
+        chapters = _chapter_list(chunks, titles, transcript)
+        artifact_store.write(video_id, "chapters.json", json.dumps(chapters))
+    else:
+        report(0.9, "Already processed; reusing saved pages")
+        chapters = json.loads(artifact_store.read(video_id, "chapters.json"))
+
+    problems = []
+    titled = [c for c in chapters if not c["title"].startswith(FAILED_TITLE_PREFIX)]
+    if len(titled) < len(chapters):
+        # The pages are written anyway; the next run of this video retries the missing titles
+        problems.append(f"{len(chapters) - len(titled)} of {len(chapters)} chapters could not be titled")
+    if chat_handler is not None:
+        # The chapter outline goes into the video's cached prompt prefix for chat
+        chat_handler.set_chapters(video_id, titled)
+
+    if indexing is not None:
+        report(0.95, "Finishing the chat and search index")
+        try:
+            indexing.result()
+        except Exception as e:
+            # The summary page is already written; chat will index the video on its first question instead
+            logger.warning("Could not index %s for chat/search: %s", video_id, e)
+            problems.append(f"chat/search index failed: {e}")
+    return {"summary": artifact_store.path(video_id, "summary.html"), "problems": problems}
@@ -0,0 +1,65 @@
+# prompt_cache.py
+from collections import OrderedDict
+import metrics
+
+
+def _state_nbytes(state):
+    # llama_cpp.LlamaState: the serialized KV cache plus copies of the token ids and the logits buffer
+    nbytes = getattr(state, "llama_state_size", 0)
+    for name in ("input_ids", "scores"):
+        nbytes += getattr(getattr(state, name, None), "nbytes", 0)
+    return nbytes
+
+
+class PromptPrefixCache:
+    """
+    Keeps llama.cpp KV-cache snapshots of evaluated prompt prefixes (system instruction plus the optional
+    per-video header), keyed by the prefix text, so videos with a header get their own snapshot. Restoring
+    a snapshot before create_completion lets llama_cpp skip re-evaluating those prefix tokens, since it only
+    evaluates the part of a prompt that differs from the tokens already in its context.
+    Each snapshot copies the model's logits buffer (tens of MB), so the cache is bounded by max_states
+    and max_bytes; the most recent snapshot is always kept.
+    Must only be used from the thread that owns the model (see InferenceScheduler).
+    """
+
+    def __init__(self, max_states=4, max_bytes=256 * 1024 * 1024):
+        self.max_states = max_states
+        self.max_bytes = max_bytes
+        self._states = OrderedDict()  # prefix -> (state, nbytes)
+        self._bytes = 0
+        self._active = None
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, llm, prefix):
+        """Puts llm in the state right after evaluating prefix, restoring a saved snapshot when there is one."""
+        if prefix == self._active:
+            # The context still starts with this prefix from the previous question
+            self.hits += 1
+            metrics.record_cache("prompt_prefix", True)
+            if prefix in self._states:
+                self._states.move_to_end(prefix)
+            return
+
+        entry = self._states.get(prefix)
+        if entry is not None:
+            self.hits += 1
+            metrics.record_cache("prompt_prefix", True)
+            self._states.move_to_end(prefix)
+            llm.load_state(entry[0])
+        else:
+            self.misses += 1
+            metrics.record_cache("prompt_prefix", False)
+            llm.reset()
+            llm.eval(llm.tokenize(prefix.encode("utf-8")))
+            state = llm.save_state()
+            nbytes = _state_nbytes(state)
+            self._states[prefix] = (state, nbytes)
+            self._bytes += nbytes
+            while len(self._states) > 1 and (len(self._states) > self.max_states or self._bytes > self.max_bytes):
+                _, (_, evicted_bytes) = self._states.popitem(last=False)
+                self._bytes -= evicted_bytes
+        self._active = prefix
+
+    def stats(self):
+        return {"states": len(self._states), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
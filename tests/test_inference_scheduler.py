@@ -0,0 +1,60 @@
+# tests/test_inference_scheduler.py
+import time
+import unittest
+from threading import Event, Thread
+from inference_scheduler import InferenceScheduler, InferenceTimeout
+
+
+class InferenceSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = InferenceScheduler(llm="llm", max_queue=4, timeout=5.0)
+        self.release = Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def block_worker(self):
+        """Occupies the worker until self.release is set."""
+        started = Event()
+
+        def busy(llm):
+            started.set()
+            self.release.wait()
+        Thread(target=self.scheduler.submit, args=(busy,), daemon=True).start()
+        self.assertTrue(started.wait(1.0))
+
+    def test_submit_returns_result(self):
+        self.assertEqual(self.scheduler.submit(lambda llm: llm.upper()), "LLM")
+
+    def test_identical_keys_share_one_run(self):
+        self.block_worker()
+        calls = []
+        results = []
+
+        def work(llm):
+            calls.append(1)
+            return "answer"
+        threads = [Thread(target=lambda: results.append(self.scheduler.submit(work, key="K"))) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join(2.0)
+        self.assertEqual(results, ["answer"] * 3)
+        self.assertEqual(len(calls), 1)
+
+    def test_retry_after_timeout_runs_again(self):
+        # The first attempt times out behind a busy worker; its request is cancelled and never run
+        self.block_worker()
+        with self.assertRaises(InferenceTimeout):
+            self.scheduler.submit(lambda llm: "first", key="K", timeout=0.1)
+        self.release.set()
+
+        started = time.monotonic()
+        self.assertEqual(self.scheduler.submit(lambda llm: "retry", key="K", timeout=1.0), "retry")
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,16 @@
+# text_utils.py
+# Small text helpers shared by the pipeline, the exports and the chat; no imports, so no side effects.
+
+
+def format_timestamp(seconds):
+    """[mm:ss] form of a video position, or hh:mm:ss from the first hour on (without the brackets)."""
+    seconds = int(seconds)
+    h = seconds // 3600
+    m = (seconds % 3600) // 60
+    s = seconds % 60
+    return f"{h:02d}:{m:02d}:{s:02d}" if h > 0 else f"{m:02d}:{s:02d}"
+
+
+def estimate_tokens(text):
+    # Rough heuristic for English text (~4 characters per token), for when no tokenizer is at hand
+    return len(text) // 4 + 1
@@ -0,0 +1,79 @@
+# title_cache.py
+import hashlib
+import os
+import sqlite3
+import time
+from threading import Lock
+
+
+class TitleCache:
+    """
+    Persistent SQLite cache of generated segment titles.
+    Entries are content-addressed (see make_key), expire after ttl_seconds and the table is trimmed
+    to max_entries by dropping the least recently used rows.
+    """
+
+    def __init__(self, path='./cache/titles.sqlite3', ttl_seconds=30 * 24 * 3600, max_entries=50000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS titles ("
+                "key TEXT PRIMARY KEY, title TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS titles_last_used ON titles (last_used)")
+
+    @staticmethod
+    def make_key(model, prompt_template, text):
+        digest = hashlib.sha256()
+        for part in (model, prompt_template, text):
+            digest.update(part.encode("utf-8"))
+            # Separator, so ("ab", "c") and ("a", "bc") hash differently
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_many(self, keys):
+        """Returns {key: title} for every key that is cached and not expired."""
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._lock, self._conn:
+            # Stay well below SQLite's bound-parameter limit
+            for offset in range(0, len(keys), 500):
+                batch = keys[offset:offset + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, title FROM titles WHERE created >= ? AND key IN ({placeholders})",
+                    [now - self.ttl_seconds] + batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany("UPDATE titles SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+        return found
+
+    def put_many(self, items):
+        """Stores {key: title} pairs and trims the cache to max_entries."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO titles (key, title, created, last_used) VALUES (?, ?, ?, ?)",
+                [(key, title, now, now) for key, title in items.items()]
+            )
+            self._conn.execute("DELETE FROM titles WHERE created < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM titles WHERE key IN ("
+                "SELECT key FROM titles ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
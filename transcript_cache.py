@@ -0,0 +1,99 @@
+# transcript_cache.py
+import gzip
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from file_utils import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Sentinel for "not cached", so a cached "no transcript" (None) can be told apart from a miss
+MISS = object()
+
+
+class TranscriptCache:
+    """
+    Two-level transcript cache: an in-process memo in front of gzip-compressed JSON files.
+    Transcripts are stored column-wise (start/duration/text arrays), which compresses far better
+    than a list of per-snippet dicts. Videos without transcripts are cached too (negative entries),
+    but only for negative_ttl_seconds, since captions can be added later.
+    The memo keeps the max_memo_entries most recently used videos; older ones are read from disk again.
+    """
+
+    def __init__(self, cache_dir='./cache/transcripts', negative_ttl_seconds=24 * 3600, max_memo_entries=64):
+        self.cache_dir = cache_dir
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_memo_entries = max_memo_entries
+        self._memo = OrderedDict()
+        self._lock = Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, video_id):
+        return os.path.join(self.cache_dir, f"{video_id}.json.gz")
+
+    def get(self, video_id):
+        """Returns the cached transcript, None for a cached negative entry, or MISS."""
+        with self._lock:
+            entry = self._memo.get(video_id)
+            if entry is not None:
+                self._memo.move_to_end(video_id)
+        if entry is None:
+            entry = self._read(video_id)
+            if entry is None:
+                return MISS
+            self._remember(video_id, entry)
+
+        if "unavailable" in entry:
+            if time.time() - entry["fetched"] > self.negative_ttl_seconds:
+                with self._lock:
+                    self._memo.pop(video_id, None)
+                return MISS
+            return None
+        return entry["transcript"]
+
+    def put(self, video_id, transcript):
+        columns = {
+            "start": [snippet["start"] for snippet in transcript],
+            "duration": [snippet.get("duration", 0.0) for snippet in transcript],
+            "text": [snippet["text"] for snippet in transcript],
+        }
+        self._write(video_id, {"fetched": time.time(), "columns": columns})
+        self._remember(video_id, {"transcript": list(transcript)})
+
+    def put_unavailable(self, video_id, reason):
+        entry = {"fetched": time.time(), "unavailable": reason}
+        self._write(video_id, entry)
+        self._remember(video_id, entry)
+
+    def _remember(self, video_id, entry):
+        with self._lock:
+            self._memo[video_id] = entry
+            self._memo.move_to_end(video_id)
+            while len(self._memo) > self.max_memo_entries:
+                self._memo.popitem(last=False)
+
+    def _read(self, video_id):
+        path = self._path(video_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable cache file for %s: %s", video_id, e)
+            return None
+        if "unavailable" in data:
+            return data
+        columns = data["columns"]
+        transcript = [
+            {"text": text, "start": start, "duration": duration}
+            for start, duration, text in zip(columns["start"], columns["duration"], columns["text"])
+        ]
+        return {"transcript": transcript}
+
+    def _write(self, video_id, data):
+        with atomic_write(self._path(video_id), "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
@@ -0,0 +1,90 @@
+# vector_store.py
+import numpy as np
+from bm25 import BM25Index, reciprocal_rank_fusion
+
+
+class VectorStore:
+    """
+    Holds every chunk embedding of one video in a single pre-normalized float32 matrix,
+    with the chunk texts and start/end times kept in parallel arrays.
+    Cosine similarity against all rows is then one matrix-vector product.
+    A BM25 inverted index over the same texts is built alongside, for hybrid (dense + keyword) search.
+    """
+
+    def __init__(self, embeddings, texts, starts=None, ends=None, normalized=False):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(texts), -1)
+        if len(matrix) != len(texts):
+            raise ValueError(f"VectorStore: got {len(matrix)} embeddings for {len(texts)} texts.")
+        if not normalized:
+            matrix = self._normalize(matrix)
+
+        self.matrix = matrix
+        self.texts = np.asarray(texts, dtype=object)
+        if starts is None:
+            starts = np.zeros(len(texts))
+        self.starts = np.asarray(starts, dtype=np.float32)
+        self.ends = self.starts if ends is None else np.asarray(ends, dtype=np.float32)
+        self.keyword_index = BM25Index(self.texts)
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        # Zero vectors stay zero and therefore score 0.0, like the old cosine_similarity did
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __bool__(self):
+        return len(self.texts) > 0
+
+    @property
+    def nbytes(self):
+        return (self.matrix.nbytes + self.starts.nbytes + self.ends.nbytes + self.keyword_index.nbytes
+                + sum(len(t) for t in self.texts))
+
+    def scores(self, query_embedding):
+        """Cosine similarity of the query against every stored chunk."""
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self), dtype=np.float32)
+        return self.matrix @ (query / norm)
+
+    def _top(self, scores, top_n):
+        top_n = min(top_n, len(scores))
+        if top_n < len(scores):
+            # argpartition is O(n); only the selected top_n rows get fully sorted
+            idx = np.argpartition(-scores, top_n - 1)[:top_n]
+        else:
+            idx = np.arange(len(scores))
+        return idx[np.argsort(-scores[idx], kind="stable")]
+
+    def _rows(self, idx, scores, keyword_matches=()):
+        return [(str(self.texts[i]), float(scores[i]), float(self.starts[i]), float(self.ends[i]),
+                 i in keyword_matches) for i in idx]
+
+    def search(self, query_embedding, top_n=3):
+        """Returns the top_n (text, similarity, start, end, keyword_match) rows, best first; keyword_match is False."""
+        if not self:
+            return []
+        scores = self.scores(query_embedding)
+        return self._rows(self._top(scores, top_n), scores)
+
+    def hybrid_search(self, query_text, query_embedding, top_n=3, candidates=50):
+        """
+        Like search(), but ranks rows by reciprocal rank fusion of the dense (cosine) and BM25 rankings,
+        so exact names and terms the embedding misses still make it into the results.
+        The returned similarity is still the cosine similarity of each row, and keyword_match tells
+        whether BM25 matched the row at all (such rows may rank high with a low cosine similarity).
+        """
+        if not self:
+            return []
+        scores = self.scores(query_embedding)
+        dense = self._top(scores, candidates).tolist()
+        keyword = [doc_id for doc_id, _ in self.keyword_index.search(query_text, candidates)]
+        fused = reciprocal_rank_fusion([dense, keyword])[:top_n]
+        return self._rows(fused, scores, set(keyword))